@@ -0,0 +1,78 @@
+"""
+Measures the memory used by the tracked players, with many players owning large libraries.
+
+Usage (from the repository root):
+    python benchmarks/memory.py [--players N] [--platinums N] [--games N]
+"""
+
+import argparse
+import gc
+import os
+import pickle
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "source"))
+
+from classes.game import Console, Game
+from classes.platinum import Platinum
+from classes.player import Player
+
+
+def create_players(n_players: int, n_platinums: int, n_games: int) -> dict[str, Player]:
+    """Creates `n_players` players with `n_platinums` platinums each, picked from `n_games` different games"""
+
+    rng = random.Random(0)
+    first_date = datetime(2010, 1, 1)
+    consoles = list(Console)
+
+    players = dict()
+    for i in range(n_players):
+        player = Player(gamer_tag=f"player-{i}")
+
+        for game_index in rng.sample(range(n_games), n_platinums):
+            # Build the strings the way the scraping does, so they aren't shared by the compiler
+            game = Game.shared(
+                id=f"{game_index}-game-{game_index}",
+                name=" ".join(["Game", str(game_index), "Deluxe Edition"]),
+                console=consoles[game_index % len(consoles)],
+            )
+            player.games_with_platinum[game] = Platinum(
+                difficulty=rng.randint(1, 10),
+                playthroughs=rng.randint(1, 3),
+                hours=rng.randint(5, 200),
+                earned_on=(first_date + timedelta(days=rng.randint(0, 5000))).toordinal(),
+            )
+
+        players[player.gamer_tag] = player
+
+    return players
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--platinums", type=int, default=500, help="platinums per player")
+    parser.add_argument("--games", type=int, default=5000, help="number of different games")
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+
+    players = create_players(args.players, args.platinums, args.games)
+
+    gc.collect()
+    used_memory, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n_platinums = args.players * args.platinums
+    n_games = len({id(game) for player in players.values() for game in player.games_with_platinum})
+
+    print(f"{args.players} players x {args.platinums} platinums ({n_games} different game objects)")
+    print(
+        f"Memory: {used_memory / 1024 / 1024:.1f} MB "
+        f"({used_memory / n_platinums:.0f} bytes per platinum, peak {peak_memory / 1024 / 1024:.1f} MB)"
+    )
+    print(f"Backup size: {len(pickle.dumps(players)) / 1024 / 1024:.1f} MB")
@@ -0,0 +1,110 @@
+"""
+Measures the cold-start latency of the bot: the time to import `main` and to load the database backup.
+
+Usage (from the repository root):
+    python benchmarks/startup.py [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "source")
+
+HEAVY_MODULES = ["PIL", "bs4", "lxml", "pyppeteer", "requests"]
+""" Modules that shouldn't be loaded until they are needed """
+
+
+def time_import(runs: int) -> list[float]:
+    """Returns the time (in seconds) taken to import `main` in a fresh interpreter, for each run"""
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", "import main"], cwd=SOURCE_DIR, check=True
+        )
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def slowest_imports(n: int = 10) -> list[tuple[int, str]]:
+    """Returns the `n` modules with the highest cumulative import time (in microseconds) when importing `main`"""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SOURCE_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        imports.append((int(cumulative), module.strip()))
+
+    return sorted(imports, reverse=True)[:n]
+
+
+def loaded_heavy_modules() -> list[str]:
+    """Returns the heavy modules that are loaded by importing `main`"""
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, main; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+        ],
+        cwd=SOURCE_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    return result.stdout.split()
+
+
+def time_backup_load() -> float | None:
+    """Returns the time (in seconds) taken to load the database backup, if there is one"""
+
+    sys.path.insert(0, SOURCE_DIR)
+    from database import Database
+
+    start = time.perf_counter()
+    loaded = Database().try_load_backup()
+    elapsed = time.perf_counter() - start
+
+    return elapsed if loaded else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="number of import runs")
+    args = parser.parse_args()
+
+    timings = time_import(args.runs)
+    print(
+        f"Import of `main`: median {statistics.median(timings) * 1000:.0f} ms, "
+        f"min {min(timings) * 1000:.0f} ms over {args.runs} runs"
+    )
+
+    print("Slowest imports (cumulative):")
+    for cumulative, module in slowest_imports():
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    heavy_modules = loaded_heavy_modules()
+    print(f"Heavy modules loaded at startup: {', '.join(heavy_modules) or 'none'}")
+
+    backup_load_time = time_backup_load()
+    if backup_load_time is None:
+        print("No backup to load")
+    else:
+        print(f"Backup load (in the background at startup): {backup_load_time * 1000:.0f} ms")
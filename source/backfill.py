@@ -0,0 +1,177 @@
+"""
+Scrapes and renders the platinums of players ahead of time, without Discord.
+
+Usage (from the repository root):
+    python source/backfill.py <gamer_tag> [<gamer_tag> ...] [--processes N]
+
+The scraped platinums are stored for the bot to use when the player is added with `$add`
+and the rendered banners are stored in the banner cache, so the bot only has to post them.
+An interrupted backfill resumes from where it stopped when run again.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from banner_cache import banner_cache, render_encoded_banners
+from constants import BANNER_RENDERED_WIDTHS
+from database import Database
+from singleton_browser import browser_page, close_browser_instance, load_page
+
+from classes.game import Game
+from classes.platinum import Platinum
+from classes.player import Player, download_banner
+
+SAVE_EVERY = 10  # games
+""" How often the progress is saved (and reported) """
+
+
+class Throughput:
+    """Keeps track of the backfill throughput"""
+
+    def __init__(self) -> None:
+
+        self.start_time = time.perf_counter()
+        self.scraped = 0
+        self.rendered = 0
+        self.skipped = 0
+
+    def report(self) -> str:
+        """Returns a summary of the throughput so far"""
+
+        elapsed = time.perf_counter() - self.start_time
+
+        return (
+            f"{self.scraped} games scraped ({self.scraped / elapsed:.2f}/s), "
+            f"{self.rendered} banners rendered ({self.rendered / elapsed:.2f}/s), "
+            f"{self.skipped} already done, in {elapsed:.0f} seconds"
+        )
+
+
+async def backfill_player(
+    player: Player,
+    db: Database,
+    executor: ProcessPoolExecutor,
+    throughput: Throughput,
+) -> list[asyncio.Task]:
+    """Scrapes the platinums of `player` and starts rendering the banners that aren't cached yet"""
+
+    async with browser_page() as page:
+        await player.update_psn_profile(sleep_seconds=10, page=page)
+        await load_page(page, player.profile_url)
+        games_with_platinum = await player.scrape_platinum_games(page)
+
+        return await backfill_games(
+            player, games_with_platinum, page, db, executor, throughput
+        )
+
+
+async def backfill_games(
+    player: Player,
+    games_with_platinum: list[tuple[Game, datetime]],
+    page,
+    db: Database,
+    executor: ProcessPoolExecutor,
+    throughput: Throughput,
+) -> list[asyncio.Task]:
+    """Scrapes the platinums of `games_with_platinum` that weren't scraped in a previous run"""
+
+    prepared_games = db.get_prepared_games(player.gamer_tag)
+
+    print(f"Backfilling {len(games_with_platinum)} platinums of {player.gamer_tag}")
+
+    render_tasks = []
+    for i, (game, date) in enumerate(games_with_platinum):
+
+        # Only scrape the games that weren't scraped in a previous run
+        if game in prepared_games:
+            platinum, banner_url = prepared_games[game]
+        else:
+            platinum, banner_url = await player.scrape_platinum(page, game, date)
+            db.add_prepared_game(player.gamer_tag, game, platinum, banner_url)
+            throughput.scraped += 1
+
+        if all(
+            banner_cache.contains(game, platinum, width)
+            for width in BANNER_RENDERED_WIDTHS
+        ):
+            throughput.skipped += 1
+        else:
+            source_banner = await download_banner(banner_url)
+            render_tasks.append(
+                asyncio.create_task(
+                    render(game, platinum, source_banner, executor, throughput)
+                )
+            )
+
+        if (i + 1) % SAVE_EVERY == 0:
+            db.save_prepared()
+            print(f"{player.gamer_tag} ({i+1}/{len(games_with_platinum)}): {throughput.report()}")
+
+    db.save_prepared()
+
+    return render_tasks
+
+
+async def render(
+    game: Game,
+    platinum: Platinum,
+    source_banner,
+    executor: ProcessPoolExecutor,
+    throughput: Throughput,
+) -> None:
+    """Renders the banner of `platinum` in `game` (at every rendered width) in the process pool and caches it"""
+
+    encoded_banners = await asyncio.get_running_loop().run_in_executor(
+        executor, render_encoded_banners, game, platinum, source_banner
+    )
+    banner_cache.put_rendered(game, platinum, encoded_banners)
+    throughput.rendered += 1
+
+
+async def backfill(gamer_tags: list[str], processes: int) -> None:
+    """Scrapes and renders the platinums of the players with `gamer_tags`"""
+
+    db = Database()
+    db.try_load_backup()
+    db.try_load_prepared()
+
+    tracked_gamer_tags = {player.gamer_tag for player in db.get_players_list()}
+    throughput = Throughput()
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            render_tasks = []
+
+            for gamer_tag in gamer_tags:
+                if gamer_tag in tracked_gamer_tags:
+                    print(f"{gamer_tag} is already being tracked, skipping backfill")
+                    continue
+
+                render_tasks += await backfill_player(
+                    Player(gamer_tag=gamer_tag), db, executor, throughput
+                )
+
+            await asyncio.gather(*render_tasks)
+    finally:
+        db.save_prepared()
+        await close_browser_instance()
+
+        print(f"Backfill finished: {throughput.report()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("gamer_tags", nargs="+", help="gamer tags to backfill")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="number of processes rendering the banners (defaults to the number of CPU cores)",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(backfill(gamer_tags=args.gamer_tags, processes=args.processes))
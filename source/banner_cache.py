@@ -0,0 +1,194 @@
+""" Contains the on-disk cache of the rendered banners """
+
+import hashlib
+import os
+from io import BytesIO
+from typing import TYPE_CHECKING
+
+from constants import (
+    BANNER_CACHE_DIR,
+    BANNER_CACHE_MAX_SIZE,
+    BANNER_RENDERED_WIDTHS,
+    BANNER_STYLE_VERSION,
+    BANNER_WIDTH,
+)
+
+from classes.game import Game
+from classes.platinum import Platinum
+
+if TYPE_CHECKING:
+    from PIL.Image import Image
+
+
+class BannerCache:
+    """
+    Content-addressed cache of the encoded banners.
+    Entries are keyed by everything that changes how a banner looks, so a style change invalidates them naturally,
+    and the least recently used ones are evicted when the cache grows above its maximum size.
+    """
+
+    def __init__(
+        self, directory: str = BANNER_CACHE_DIR, max_size: int = BANNER_CACHE_MAX_SIZE
+    ) -> None:
+
+        self.__directory = directory
+        self.__max_size = max_size
+        self.__size = None  # Computed on the first write
+
+    @staticmethod
+    def key(game: Game, platinum: Platinum, width: int) -> str:
+        """Returns the cache key of the banner of `platinum` in `game` rendered `width` pixels wide"""
+
+        content = "|".join(
+            str(value)
+            for value in (
+                BANNER_STYLE_VERSION,
+                width,
+                game.id,
+                game.name,
+                game.console.name,
+                platinum.difficulty,
+                platinum.playthroughs,
+                platinum.hours,
+                platinum.date_earned.date().isoformat(),
+            )
+        )
+
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(
+        self, game: Game, platinum: Platinum, width: int = BANNER_WIDTH
+    ) -> bytes | None:
+        """Returns the encoded banner of `platinum` in `game` (`width` pixels wide) if it is cached"""
+
+        path = self.__path(self.key(game, platinum, width))
+
+        try:
+            with open(path, "rb") as banner_file:
+                banner = banner_file.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass  # Evicted by another process after being read
+
+        return banner
+
+    def contains(
+        self, game: Game, platinum: Platinum, width: int = BANNER_WIDTH
+    ) -> bool:
+        """Checks if the banner of `platinum` in `game` (`width` pixels wide) is cached"""
+
+        return os.path.exists(self.__path(self.key(game, platinum, width)))
+
+    def put_rendered(
+        self, game: Game, platinum: Platinum, encoded_banners: dict[int, bytes]
+    ) -> None:
+        """Caches every size of the banner of `platinum` in `game` returned by `render_encoded_banners`"""
+
+        for width, encoded_banner in encoded_banners.items():
+            self.put_encoded(game, platinum, encoded_banner, width)
+
+    def put_encoded(
+        self,
+        game: Game,
+        platinum: Platinum,
+        encoded_banner: bytes,
+        width: int = BANNER_WIDTH,
+    ) -> bytes:
+        """Caches the already encoded banner of `platinum` in `game` (`width` pixels wide)"""
+
+        os.makedirs(self.__directory, exist_ok=True)
+
+        # Write to a temporary file first so a partially written banner is never read
+        path = self.__path(self.key(game, platinum, width))
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as banner_file:
+            banner_file.write(encoded_banner)
+        os.replace(temporary_path, path)
+
+        if self.__size is None:
+            self.__size = self.__directory_size()
+        else:
+            self.__size += len(encoded_banner)
+
+        if self.__size > self.__max_size:
+            self.__evict()
+
+        return encoded_banner
+
+    def __evict(self) -> None:
+        """Deletes the least recently used banners until the cache fits in its maximum size"""
+
+        entries = []
+        for entry in os.scandir(self.__directory):
+            if entry.is_file() and entry.name.endswith(".png"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Evicted by another process
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()  # Least recently used first
+
+        # Recompute the size since other processes (e.g. the backfill) may have written to the cache
+        self.__size = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if self.__size <= self.__max_size:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.__size -= size
+
+    def __directory_size(self) -> int:
+        """Returns the size of the banners in the cache directory"""
+
+        size = 0
+        for entry in os.scandir(self.__directory):
+            if entry.is_file() and entry.name.endswith(".png"):
+                try:
+                    size += entry.stat().st_size
+                except FileNotFoundError:
+                    pass  # Evicted by another process
+
+        return size
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.__directory, f"{key}.png")
+
+
+def encode_banner(banner: "Image") -> bytes:
+    """Encodes a banner in the format sent to Discord"""
+
+    banner_file = BytesIO()
+    banner.save(banner_file, format="PNG")
+
+    return banner_file.getvalue()
+
+
+def render_encoded_banners(
+    game: Game,
+    platinum: Platinum,
+    source_banner: "Image",
+    widths: list[int] = BANNER_RENDERED_WIDTHS,
+) -> dict[int, bytes]:
+    """
+    Renders and encodes the banner of `platinum` in `game` at each of the `widths`
+    (used by the process pools, so it must stay picklable)
+    """
+
+    return {
+        width: encode_banner(banner)
+        for width, banner in game.create_platinum_banners(
+            platinum, source_banner, widths
+        ).items()
+    }
+
+
+banner_cache = BannerCache()
@@ -0,0 +1,50 @@
+""" Contains the index of the channels inside the bot category of each guild """
+
+
+class ChannelIndex:
+    """
+    Maps the channel names (i.e. the formatted gamer tags) inside the bot category to their ids, per guild,
+    so the channels don't have to be searched for on every lookup
+    """
+
+    def __init__(self) -> None:
+
+        # Key is the guild id, the values map the channel name to the channel id
+        self.__channels: dict[int, dict[str, int]] = dict()
+
+    def get(self, guild_id: int, channel_name: str) -> int | None:
+        """Returns the id of the channel with `channel_name` in the guild, if it is indexed"""
+
+        return self.__channels.get(guild_id, dict()).get(channel_name)
+
+    def set(self, guild_id: int, channel_name: str, channel_id: int):
+        """Indexes the channel with `channel_name` in the guild"""
+
+        self.__channels.setdefault(guild_id, dict())[channel_name] = channel_id
+
+    def remove(self, guild_id: int, channel_id: int):
+        """Removes the channel with `channel_id` from the guild index"""
+
+        channels = self.__channels.get(guild_id, dict())
+
+        for channel_name, indexed_id in list(channels.items()):
+            if indexed_id == channel_id:
+                del channels[channel_name]
+
+    def remove_guild(self, guild_id: int):
+        """Removes every channel of the guild from the index"""
+
+        self.__channels.pop(guild_id, None)
+
+    def get_state(self) -> dict[int, dict[str, int]]:
+        """Returns the index contents (used to persist it)"""
+
+        return self.__channels
+
+    def set_state(self, channels: dict[int, dict[str, int]]):
+        """Replaces the index contents (used to restore it)"""
+
+        self.__channels = channels
+
+
+channel_index = ChannelIndex()
@@ -1,16 +1,24 @@
+import sys
 from dataclasses import dataclass
 from enum import Enum, auto
+from typing import TYPE_CHECKING
+from weakref import WeakValueDictionary
 
-from PIL import Image, ImageDraw, ImageFont, ImageOps
+from constants import BANNER_REFERENCE_WIDTH, BANNER_WIDTH
 
 from .platinum import Platinum
 
-FONT_PATH = "assets/PixelifySans-VariableFont_wght.ttf"
+if TYPE_CHECKING:
+    from PIL import Image
+
 PLATINUM_ICON = "assets/platinum_trophy.png"
 PS3_ICON = "assets/ps3_icon.png"
 PS4_ICON = "assets/ps4_icon.png"
 PS5_ICON = "assets/ps5_icon.png"
 
+BORDER_SIZE = 30  # px
+""" Size of the banner border at `BANNER_REFERENCE_WIDTH` """
+
 
 class Console(Enum):
     """Represents the possible consoles"""
@@ -20,7 +28,16 @@ class Console(Enum):
     PS5 = auto()
 
 
-@dataclass
+_shared_games: "WeakValueDictionary[tuple[str, Console], Game]" = (
+    WeakValueDictionary()
+)
+""" The instance of each game, shared by every player who owns it """
+
+_legacy_platinums: dict[int, Platinum] = dict()
+""" Platinums of games unpickled from old backups (where each game had its own), claimed by the `Player` """
+
+
+@dataclass(slots=True, weakref_slot=True, eq=False)
 class Game:
     """Represents a general playstation game"""
 
@@ -30,36 +47,72 @@ class Game:
 
     console: Console
 
-    banner: Image = None
+    def __post_init__(self):
+        self.id = sys.intern(self.id)
+        self.name = sys.intern(self.name)
 
-    platinum: Platinum = None
+    @classmethod
+    def shared(cls, id: str, name: str, console: Console) -> "Game":
+        """Returns the single instance of the game, shared by every player who owns it"""
 
-    def create_platinum_banner(self) -> Image:
-        """Creates the platinum banner for this game"""
+        game = _shared_games.get((id, console))
 
-        if self.platinum is None:
-            raise ValueError("This game doesn't have a platinum trophy yet.")
+        if game is None:
+            game = cls(id=id, name=name, console=console)
+            _shared_games[(game.id, game.console)] = game
+
+        return game
+
+    def create_platinum_banners(
+        self, platinum: Platinum, source_banner: "Image", widths: list[int]
+    ) -> dict[int, "Image"]:
+        """Creates the banner of `platinum` for this game at each of the `widths` (e.g. the banner and its thumbnail)"""
+
+        banners = dict()
+
+        # Downsample the source progressively, from the biggest width to the smallest
+        for width in sorted(widths, reverse=True):
+            source_banner = _downsample(
+                source_banner, width - 2 * _scaled(BORDER_SIZE, width)
+            )
+            banners[width] = self.create_platinum_banner(platinum, source_banner, width)
+
+        return banners
+
+    def create_platinum_banner(
+        self, platinum: Platinum, source_banner: "Image", width: int = BANNER_WIDTH
+    ) -> "Image":
+        """
+        Creates the banner of `platinum` for this game on top of the game `source_banner`.
+        The banner is `width` pixels wide, with the styling scaled accordingly.
+        """
+
+        # Imported here so the bot doesn't load Pillow until it renders a banner
+        from PIL import Image, ImageDraw, ImageOps
+        from text_layout import text_layout
 
         if (
-            self.platinum.difficulty is not None
-            and self.platinum.playthroughs is not None
-            and self.platinum.hours is not None
+            platinum.difficulty is not None
+            and platinum.playthroughs is not None
+            and platinum.hours is not None
         ):
             has_guide = True
         else:
             has_guide = False
 
-        banner = self.banner.convert("RGBA")
-        initial_height = banner.size[1]
-
         #################### Styling ####################
-        border_size = 30
+        border_size = _scaled(BORDER_SIZE, width)
         border_color = (0, 48, 135, 255)
         overlay_opacity = 0.7
         overlay_color = (128, 128, 128, round(overlay_opacity * 256))
+        normal_font_size = _scaled(40, width)
+        title_font_size = _scaled(60, width)
+        normal_font = text_layout.font(normal_font_size)
+
+        # Bring the source to the final size first, so everything after works on as few pixels as possible
+        banner = _downsample(source_banner, width - 2 * border_size).convert("RGBA")
+        initial_height = banner.size[1]
         overlay_width = round(0.2 * banner.size[0])
-        normal_font = ImageFont.truetype(FONT_PATH, 40)
-        title_font = ImageFont.truetype(FONT_PATH, 60)
 
         #################### Border ####################
         banner = ImageOps.expand(banner, border=border_size, fill=border_color)
@@ -92,7 +145,7 @@ class Game:
             banner.size[0] - border_size - overlay_width,
             border_size,
         )
-        padding = 20
+        padding = _scaled(20, width)
         y_offset = initial_height / 3
 
         first_x = top_left_overlay_corner[0] + padding
@@ -118,7 +171,7 @@ class Game:
                     second_x,
                     first_y,
                 ),
-                f"{self.platinum.difficulty}/10",
+                f"{platinum.difficulty}/10",
                 font=normal_font,
                 fill="white",
                 anchor="rm",
@@ -138,7 +191,7 @@ class Game:
                     second_x,
                     second_y,
                 ),
-                str(self.platinum.playthroughs),
+                str(platinum.playthroughs),
                 font=normal_font,
                 fill="white",
                 anchor="rm",
@@ -158,7 +211,7 @@ class Game:
                     second_x,
                     third_y,
                 ),
-                str(self.platinum.hours),
+                str(platinum.hours),
                 font=normal_font,
                 fill="white",
                 anchor="rm",
@@ -166,14 +219,14 @@ class Game:
 
         #################### Icons and Plat Date ####################
         middle_x = border_size + overlay_width / 2
-        padding = 20
+        padding = _scaled(20, width)
 
         draw.text(
             (
                 middle_x,
                 second_y,
             ),
-            self.platinum.date_earned.strftime("%d  %b  %Y"),
+            platinum.date_earned.strftime("%d  %b  %Y"),
             font=normal_font,
             fill="white",
             anchor="mm",
@@ -188,68 +241,40 @@ class Game:
                 console_image = PS5_ICON
 
         console_image = Image.open(console_image).convert("RGBA")
+        console_image = console_image.resize(
+            [_scaled(dim, width) for dim in console_image.size],
+            Image.Resampling.LANCZOS,
+        )
 
         platinum_image = Image.open(PLATINUM_ICON).convert("RGBA")
         platinum_image = platinum_image.resize(
-            [round(dim * 0.35) for dim in platinum_image.size]
+            [_scaled(dim * 0.35, width) for dim in platinum_image.size],
+            Image.Resampling.LANCZOS,
         )
 
         #################### Title ####################
 
-        max_width = 1 * overlay_width
-
-        # If the game title fits in one line use the bigger font,
-        # otherwise, change to multiline format with the normal font size
-        if draw.textlength(self.name, title_font) <= max_width:
-            draw.text(
-                (
-                    middle_x,
-                    third_y,
-                ),
-                self.name,
-                font=title_font,
-                fill="white",
-                anchor="mm",
-                stroke_width=1,
-                align="center",
-            )
-
-        else:
-
-            # Add the maximum possible of words per line that don't exceed `max_width`
-            lines = []
-            words = self.name.split()
-            i = 0
-            while i < len(words):
-
-                # Add the words to the current line until limit is exceeded
-                current_line = ""
-                while (
-                    i < len(words)
-                    and draw.textlength(current_line, normal_font) <= max_width
-                ):
-                    current_line += words[i] + " "
-                    i += 1
-
-                # Remove last added word and space if last added word exceeded space
-                if not draw.textlength(current_line, normal_font) <= max_width:
-                    i -= 1
-                    current_line = current_line[: -1 - len(words[i])]
-
-                lines.append(current_line[:-1])  # Remove last empty space
+        # Use the biggest font (up to the title size) with which the wrapped title fits its slot
+        title_font, title = text_layout.fit(
+            self.name,
+            max_width=overlay_width,
+            max_height=y_offset - padding,
+            max_size=title_font_size,
+            min_size=normal_font_size // 2,
+        )
 
-            draw.text(
-                (
-                    middle_x,
-                    third_y,
-                ),
-                "\n".join(lines),
-                font=normal_font,
-                fill="white",
-                anchor="mm",
-                stroke_width=1,
-                align="center",
-            )
+        draw.text(
+            (
+                middle_x,
+                third_y,
+            ),
+            title,
+            font=title_font,
+            fill="white",
+            anchor="mm",
+            stroke_width=1,
+            align="center",
+        )
 
         #################### Final composition ####################
 
@@ -278,4 +303,55 @@ class Game:
         return hash((self.id, self.console.value))
 
     def __eq__(self, other):
-        return hash(self) == hash(other)
+        if not isinstance(other, Game):
+            return NotImplemented
+
+        return self.id == other.id and self.console == other.console
+
+    def __setstate__(self, state: dict | tuple):
+        """Restores a pickled game (also from backups made before the games were shared)"""
+
+        if isinstance(state, tuple):
+            state = state[1]  # Slotted objects are pickled as (None, slots)
+
+        object.__setattr__(self, "id", sys.intern(state["id"]))
+        object.__setattr__(self, "name", sys.intern(state["name"]))
+        object.__setattr__(self, "console", state["console"])
+
+        # Old backups kept the platinum inside the game, leave it for the player to claim
+        if state.get("platinum") is not None:
+            _legacy_platinums[id(self)] = state["platinum"]
+
+        _shared_games.setdefault((self.id, self.console), self)
+
+
+def _scaled(size: float, width: int) -> int:
+    """Scales a styling `size` (designed for `BANNER_REFERENCE_WIDTH`) to a banner `width` pixels wide"""
+
+    return max(1, round(size * width / BANNER_REFERENCE_WIDTH))
+
+
+def _downsample(source_banner: "Image", width: int) -> "Image":
+    """Resizes `source_banner` to `width` pixels wide, keeping its aspect ratio"""
+
+    from PIL import Image
+
+    if source_banner.size[0] == width:
+        return source_banner
+
+    # Palette images can only be resized with the nearest neighbour filter
+    if source_banner.mode not in ("RGB", "RGBA"):
+        source_banner = source_banner.convert("RGBA")
+
+    height = round(source_banner.size[1] * width / source_banner.size[0])
+
+    # The reducing gap shrinks big sources with a cheap box reduction before the (expensive) Lanczos filter
+    return source_banner.resize(
+        (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+    )
+
+
+def claim_legacy_platinum(game: Game) -> Platinum | None:
+    """Returns the platinum an unpickled old game had inside it"""
+
+    return _legacy_platinums.pop(id(game), None)
@@ -1,8 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class Platinum:
     """Represents a platinum trophy"""
 
@@ -12,4 +12,20 @@ class Platinum:
 
     hours: int | None
 
-    date_earned: datetime
+    earned_on: int  # Proleptic Gregorian ordinal of the date, see `date_earned`
+
+    @property
+    def date_earned(self) -> datetime:
+        return datetime.fromordinal(self.earned_on)
+
+    def __setstate__(self, state: dict | tuple):
+        """Restores a pickled platinum (also from backups made before the date was stored as an ordinal)"""
+
+        if isinstance(state, tuple):
+            state = state[1]  # Slotted objects are pickled as (None, slots)
+
+        if "date_earned" in state:
+            state["earned_on"] = state["date_earned"].toordinal()
+
+        for field in fields(self):
+            object.__setattr__(self, field.name, state.get(field.name))
@@ -1,44 +1,178 @@
 import asyncio
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from io import BytesIO
-from typing import Set
+from typing import TYPE_CHECKING, Dict, List
 
-import requests
-from bs4 import BeautifulSoup
-from PIL import Image
-from singleton_browser import get_browser_page
+from banner_cache import banner_cache, render_encoded_banners
+from constants import BANNER_WIDTH
+from singleton_browser import browser_page, load_page
 
-from .game import Console, Game
+from .game import Console, Game, claim_legacy_platinum
 from .platinum import Platinum
 
+if TYPE_CHECKING:
+    from PIL import Image
 
-@dataclass
+
+@dataclass(slots=True)
+class PlayerUpdate:
+    """The changes found when updating a player (applied with `Player.apply_update`)"""
+
+    gamer_tag: str
+
+    new_platinums: Dict[Game, Platinum] = field(default_factory=dict)
+
+    # Encoded banners of the new platinums, in chronological order
+    banners: List[bytes] = field(default_factory=list)
+
+    platinum_count: str | None = None
+
+    last_activity: str | None = None
+
+
+@dataclass(slots=True)
 class Player:
     """Represents a player"""
 
     gamer_tag: str
 
-    games_with_platinum: Set[Game] = field(default_factory=set)
+    # The games are shared with the other players who own them, the platinum is this player's
+    games_with_platinum: Dict[Game, Platinum] = field(default_factory=dict)
+
+    # Profile summary seen on the last update, used to skip the full scrape when nothing changed
+    platinum_count: str | None = None
 
-    async def get_new_platinums_banners(self, discord_ctx) -> list:
-        """Returns the banners of the newly achieved platinums"""
+    last_activity: str | None = None
+
+    async def get_new_platinums_banners(
+        self,
+        discord_ctx=None,
+        prepared_games: dict[Game, tuple[Platinum, str]] | None = None,
+    ) -> PlayerUpdate:
+        """
+        Returns the newly achieved platinums and their banners, without changing the player
+        (so it can run in a worker process, the update is applied by the database).
+        The progress is reported on `discord_ctx` (if given) and the games in `prepared_games`
+        (already scraped by the backfill) skip their trophy and guide pages.
+        """
 
         sleep_seconds = 10
+        prepared_games = prepared_games or dict()
 
-        discord_message = await discord_ctx.send(
-            f"Waiting for {self.gamer_tag} PSN profile update ({sleep_seconds} seconds)"
-        )
+        discord_message = None
+        if discord_ctx is not None:
+            discord_message = await discord_ctx.send(
+                f"Waiting for {self.gamer_tag} PSN profile update ({sleep_seconds} seconds)"
+            )
+
+        # Keep the browser alive for the whole update
+        async with browser_page() as page:
+            await self.update_psn_profile(sleep_seconds=sleep_seconds, page=page)
 
-        await self.__update_psn_profile(sleep_seconds=sleep_seconds)
+            await self.__report(discord_message, f"Updated {self.gamer_tag} PSN profile")
 
-        await discord_message.edit(content=f"Updated {self.gamer_tag} PSN profile")
+            # Most players don't earn a platinum between updates, so check the profile summary first
+            await load_page(page, self.profile_url)
+            platinum_count, last_activity = await self.scrape_profile_summary(page)
+            update = PlayerUpdate(
+                gamer_tag=self.gamer_tag,
+                platinum_count=platinum_count,
+                last_activity=last_activity,
+            )
 
-        new_platinums_banner = []
+            if (
+                platinum_count is not None
+                and last_activity is not None
+                and (platinum_count, last_activity)
+                == (self.platinum_count, self.last_activity)
+            ):
+                await self.__report(
+                    discord_message, f"No new trophies for {self.gamer_tag}"
+                )
+                return update
 
-        page = await get_browser_page()
+            games_with_platinum = await self.scrape_platinum_games(page)
+
+            for i, (game, date) in enumerate(games_with_platinum):
+
+                # Retrieve platinum info and generate banner
+                if game not in self.games_with_platinum:
+                    await self.__report(
+                        discord_message,
+                        f"Progress ({i+1}/{len(games_with_platinum)}) - Generating banner for '{game.name}'",
+                    )
+
+                    if game in prepared_games:
+                        platinum, banner_url = prepared_games[game]
+                    else:
+                        platinum, banner_url = await self.scrape_platinum(
+                            page, game, date
+                        )
+
+                    # Update games list and generate banner (only if it wasn't rendered before)
+                    update.new_platinums[game] = platinum
+
+                    banner = banner_cache.get(game, platinum)
+                    if banner is None:
+                        # Other sizes (if enabled) are rendered along with the banner, reusing the downsampled source
+                        banners = render_encoded_banners(
+                            game, platinum, await download_banner(banner_url)
+                        )
+                        banner_cache.put_rendered(game, platinum, banners)
+                        banner = banners[BANNER_WIDTH]
+                        print(f"Created banner of game {game.name} for {self.gamer_tag}")
+                    else:
+                        print(f"Reused cached banner of game {game.name} for {self.gamer_tag}")
+
+                    update.banners.append(banner)
+                else:
+                    await self.__report(
+                        discord_message,
+                        f"Progress ({i+1}/{len(games_with_platinum)}) - '{game.name}' is not a new platinum",
+                    )
+
+        return update
+
+    def apply_update(self, update: PlayerUpdate):
+        """Records the changes found by `get_new_platinums_banners`"""
+
+        for game, platinum in update.new_platinums.items():
+            # Games coming from other processes are copies, use the shared instance
+            game = Game.shared(id=game.id, name=game.name, console=game.console)
+            self.games_with_platinum[game] = platinum
+
+        # The summary is only remembered once every new platinum was processed
+        self.platinum_count = update.platinum_count
+        self.last_activity = update.last_activity
+
+    @property
+    def profile_url(self) -> str:
+        return f"https://psnprofiles.com/{self.gamer_tag}"
+
+    async def scrape_profile_summary(self, page) -> tuple[str | None, str | None]:
+        """
+        Returns the platinum count and the latest activity (the most recently played game and its progress)
+        from the loaded profile page, without parsing the whole page
+        """
+
+        return await page.evaluate(
+            """() => {
+            const platinums = document.querySelector(".trophy-count li.platinum, .profile-bar li.platinum");
+            const lastPlayed = document.querySelector("#gamesTable tr");
+
+            return [
+                platinums ? platinums.textContent.trim() : null,
+                lastPlayed ? lastPlayed.innerText.trim() : null,
+            ];
+        }"""
+        )
+
+    async def scrape_platinum_games(self, page) -> list[tuple[Game, datetime]]:
+        """Returns the games with platinum (and the date it was earned) from the loaded profile page, in chronological order"""
+
+        from bs4 import BeautifulSoup
 
-        await page.goto(f"https://psnprofiles.com/{self.gamer_tag}")
         await asyncio.sleep(0.1)
 
         # Retrieve all games with platinum
@@ -48,7 +182,8 @@ class Player:
 
         games_with_platinum.reverse()  # Chronological order
 
-        for i, game in enumerate(games_with_platinum):
+        games = []
+        for game in games_with_platinum:
 
             # Scrape the information needed to create the game object
             tds = game.find_all("td")
@@ -64,83 +199,70 @@ class Player:
                 date[: space_index - 2] + date[space_index:], "%d %B %Y"
             )
 
-            game = Game(id=game_id, name=name, console=console)
+            games.append((Game.shared(id=game_id, name=name, console=console), date))
 
-            # Retrieve platinum info and generate banner
-            if game not in self.games_with_platinum:
-                await discord_message.edit(
-                    content=f"Progress ({i+1}/{len(games_with_platinum)}) - Generating banner for '{game.name}'"
-                )
+        return games
 
-                # Go to game trophies page to get the link of the guide page
-                await page.goto(
-                    f"https://psnprofiles.com/trophies/{game.id}/{self.gamer_tag}"
-                )
-                await asyncio.sleep(0.1)
-                game_trophies_soup = BeautifulSoup(await page.content(), "lxml")
-
-                # Retrieve game banner
-                banner_url = (
-                    game_trophies_soup.find(id="first-banner")
-                    .find_all("div")[-1]["style"]
-                    .split("url(")[-1][:-1]
-                )
-                banner_response = requests.get(banner_url)
-                await asyncio.sleep(0.1)
-                image_data = BytesIO(banner_response.content)
-                game.banner = Image.open(image_data)
+    async def scrape_platinum(
+        self, page, game: Game, date: datetime
+    ) -> tuple[Platinum, str]:
+        """Returns the platinum information of `game` and the url of its banner"""
 
-                # Go to the guide page to get the platinum information
-                guide_link = game_trophies_soup.find("div", class_="guide-page-info")
+        from bs4 import BeautifulSoup
 
-                platinum_hours = None
-                platinum_playthroughs = None
-                platinum_difficulty = None
+        # Go to game trophies page to get the link of the guide page
+        await load_page(
+            page, f"https://psnprofiles.com/trophies/{game.id}/{self.gamer_tag}"
+        )
+        await asyncio.sleep(0.1)
+        game_trophies_soup = BeautifulSoup(await page.content(), "lxml")
 
-                # If it has a guide, retrieve information
-                if guide_link is not None:
+        # Retrieve game banner
+        banner_url = (
+            game_trophies_soup.find(id="first-banner")
+            .find_all("div")[-1]["style"]
+            .split("url(")[-1][:-1]
+        )
 
-                    await page.goto(f'https://psnprofiles.com{guide_link.a["href"]}')
-                    await asyncio.sleep(0.1)
-                    guide_soup = BeautifulSoup(await page.content(), "lxml")
+        # Go to the guide page to get the platinum information
+        guide_link = game_trophies_soup.find("div", class_="guide-page-info")
 
-                    platinum_info_spans = guide_soup.find(
-                        "div", class_="overview-info"
-                    ).find_all("span", recursive=False)
+        platinum_hours = None
+        platinum_playthroughs = None
+        platinum_difficulty = None
 
-                    platinum_difficulty = int(
-                        platinum_info_spans[0].find("span").text.split("/")[0]
-                    )
-                    platinum_playthroughs = int(
-                        platinum_info_spans[1].find("span").text
-                    )
-                    platinum_hours = int(platinum_info_spans[2].find("span").text)
+        # If it has a guide, retrieve information
+        if guide_link is not None:
 
-                platinum = Platinum(
-                    difficulty=platinum_difficulty,
-                    playthroughs=platinum_playthroughs,
-                    hours=platinum_hours,
-                    date_earned=date,
-                )
-                game.platinum = platinum
-
-                # Update games list and generate banner
-                self.games_with_platinum.add(game)
-                new_platinums_banner.append(game.create_platinum_banner())
-                print(f"Created banner of game {game.name} for {self.gamer_tag}")
-            else:
-                await discord_message.edit(
-                    content=f"Progress ({i+1}/{len(games_with_platinum)}) - '{game.name}' is not a new platinum"
-                )
+            await load_page(
+                page, f'https://psnprofiles.com{guide_link.a["href"]}'
+            )
+            await asyncio.sleep(0.1)
+            guide_soup = BeautifulSoup(await page.content(), "lxml")
 
-        return new_platinums_banner
+            platinum_info_spans = guide_soup.find(
+                "div", class_="overview-info"
+            ).find_all("span", recursive=False)
 
-    async def __update_psn_profile(self, sleep_seconds) -> None:
-        """Updates the PSNProfile so that the latest trophy information can be extracted"""
+            platinum_difficulty = int(
+                platinum_info_spans[0].find("span").text.split("/")[0]
+            )
+            platinum_playthroughs = int(platinum_info_spans[1].find("span").text)
+            platinum_hours = int(platinum_info_spans[2].find("span").text)
+
+        platinum = Platinum(
+            difficulty=platinum_difficulty,
+            playthroughs=platinum_playthroughs,
+            hours=platinum_hours,
+            earned_on=date.toordinal(),
+        )
 
-        page = await get_browser_page()
+        return platinum, banner_url
+
+    async def update_psn_profile(self, sleep_seconds, page) -> None:
+        """Updates the PSNProfile so that the latest trophy information can be extracted"""
 
-        await page.goto("https://psnprofiles.com/")
+        await load_page(page, "https://psnprofiles.com/")
 
         # Find the text input field by id and type gamer tag
         await page.type("#psnId", self.gamer_tag)
@@ -154,3 +276,39 @@ class Player:
 
         print(f"Updating {self.gamer_tag} profile, sleeping {sleep_seconds} seconds...")
         await asyncio.sleep(sleep_seconds)
+
+    def __setstate__(self, state: dict | tuple):
+        """Restores a pickled player (also from backups made before the games were shared)"""
+
+        if isinstance(state, tuple):
+            state = state[1]  # Slotted objects are pickled as (None, slots)
+
+        # Old backups had a set of games, each with its platinum inside
+        if isinstance(state["games_with_platinum"], set):
+            state["games_with_platinum"] = {
+                Game.shared(game.id, game.name, game.console): claim_legacy_platinum(game)
+                for game in state["games_with_platinum"]
+            }
+
+        for field_ in fields(self):
+            object.__setattr__(self, field_.name, state.get(field_.name))
+
+    @staticmethod
+    async def __report(discord_message, content: str) -> None:
+        """Shows the progress on the discord message (if there is one)"""
+
+        if discord_message is not None:
+            await discord_message.edit(content=content)
+
+
+async def download_banner(banner_url: str) -> "Image":
+    """Downloads the source image of a game banner"""
+
+    import requests
+    from PIL import Image
+
+    banner_response = requests.get(banner_url)
+    await asyncio.sleep(0.1)
+    image_data = BytesIO(banner_response.content)
+
+    return Image.open(image_data)
@@ -10,3 +10,69 @@ UPDATE_INTERVAL = 12 * 60  # minutes
 """ The interval between each automatic update"""
 
 CHROMIUM_RASPBERRY_PATH = "/usr/bin/chromium"
+
+BANNER_STYLE_VERSION = 3
+""" Version of the banner style, bump it whenever the rendering changes so the cached banners are invalidated """
+
+BANNER_REFERENCE_WIDTH = 1920  # px
+""" Banner width the styling (borders, fonts, paddings and icons) is designed for, it is scaled for other widths """
+
+BANNER_WIDTH = 1280  # px
+""" Width of the banners sent to the players channels """
+
+BANNER_THUMBNAIL_WIDTH = 480  # px
+""" Width of the banner thumbnails """
+
+BANNER_RENDERED_WIDTHS = [BANNER_WIDTH]
+""" Widths every banner is rendered and cached at (add `BANNER_THUMBNAIL_WIDTH` to also cache thumbnails) """
+
+BANNER_CACHE_DIR = "banner_cache"
+""" Directory where the rendered banners are cached """
+
+BANNER_CACHE_MAX_SIZE = 256 * 1024 * 1024  # bytes
+""" Maximum size of the banner cache, the least recently used banners are evicted above it """
+
+BROWSER_IDLE_TIMEOUT = 5  # minutes
+""" The browser is closed after being unused for this long """
+
+BROWSER_PREWARM = 2  # minutes
+""" The browser is launched this long before each automatic update (should be lower than `BROWSER_IDLE_TIMEOUT`) """
+
+BROWSER_MAX_RSS = 512 * 1024 * 1024  # bytes
+""" The browser is restarted when its memory usage goes above this """
+
+BROWSER_ALLOWED_RESOURCE_TYPES = ["document", "script", "xhr", "fetch"]
+""" Resource types the browser is allowed to load, everything else (images, fonts, stylesheets, ...) is blocked """
+
+BROWSER_ALLOWED_DOMAINS = ["psnprofiles.com"]
+""" Domains (and their subdomains) the browser is allowed to load from, requests to any other domain are blocked """
+
+DISCORD_CONCURRENCY = 5
+""" Maximum number of channel operations sent to Discord at the same time (per guild) """
+
+DISCORD_RETRIES = 3
+""" Times a channel operation is retried after being rate limited """
+
+PROFILES_DIR = "profiles"
+""" Directory where the profiling reports are written """
+
+PROFILE_TOP_N = 10
+""" Number of entries in each section of the profiling summaries """
+
+SLOW_CALLBACK_DURATION = 0.1  # s
+""" While profiling, event loop callbacks running longer than this are reported """
+
+WATCHDOG_INTERVAL = 0.1  # s
+""" How often the event loop watchdog measures the event loop lag """
+
+WATCHDOG_THRESHOLD = 0.25  # s
+""" The watchdog captures the stack of the event loop when a callback blocks it for longer than this """
+
+WATCHDOG_TOP_N = 5
+""" Number of call sites blocking the event loop the most reported by `$metrics` """
+
+LEADERBOARD_SIZE = 10
+""" Number of players shown by `$leaderboard` """
+
+GAME_OWNERS_SHOWN = 20
+""" Number of players with the platinum listed by `$game` (the rest are only counted) """
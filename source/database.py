@@ -1,7 +1,15 @@
+import asyncio
 import os
 import pickle
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from classes.player import Player
+from channel_index import channel_index
+from constants import LEADERBOARD_SIZE
+from stats import GameStats, PlayerStats, Stats
+
+from classes.game import Game
+from classes.platinum import Platinum
+from classes.player import Player, PlayerUpdate
 
 
 class Database:
@@ -11,11 +19,22 @@ class Database:
     """
 
     __BACKUP_FILE = "db.pkl"
+    __PREPARED_FILE = "prepared.pkl"
+    __CHANNELS_FILE = "channels.pkl"
 
     def __init__(self) -> None:
 
         self.__data: dict[str, Player] = dict()  # Key is the gamer tag
 
+        # Platinums scraped ahead of time by the backfill (key is the gamer tag),
+        # each game maps to its platinum and the url of its banner
+        self.__prepared: dict[str, dict[Game, tuple[Platinum, str]]] = dict()
+
+        self.__backup_loading: Future | None = None
+
+        # Aggregates of the players and games, kept up to date with every change to the players
+        self.__stats = Stats()
+
     def add_player(self, new_gamer_tag: Player):
         """Adds a player"""
 
@@ -26,6 +45,7 @@ class Database:
         player = Player(gamer_tag=new_gamer_tag)
 
         self.__data[new_gamer_tag] = player
+        self.__stats.add_player(new_gamer_tag)
 
         return player
 
@@ -35,25 +55,123 @@ class Database:
         if gamer_tag not in self.__data:
             raise ValueError("This player doesn't exist.")
         else:
-            del self.__data[gamer_tag]
+            self.__stats.remove_player(self.__data.pop(gamer_tag))
 
     def get_players_list(self) -> list[Player]:
         """Returns the list of players being tracked"""
 
         return list(self.__data.values())
 
+    def apply_player_update(self, update: PlayerUpdate):
+        """Records the changes found when updating a player (the single write path for scraped data)"""
+
+        player = self.__data.get(update.gamer_tag)
+
+        # The player may have been removed while it was being updated
+        if player is not None:
+            player.apply_update(update)
+
+            for game, platinum in update.new_platinums.items():
+                self.__stats.add_platinum(
+                    player.gamer_tag,
+                    Game.shared(id=game.id, name=game.name, console=game.console),
+                    platinum,
+                )
+
+    def get_leaderboard(self, order_by: str) -> list[PlayerStats]:
+        """Returns the stats of the best players according to `order_by` (platinums, hours, difficulty or unique)"""
+
+        return self.__stats.get_leaderboard(order_by=order_by, size=LEADERBOARD_SIZE)
+
+    def get_game_stats(self, game_id: str) -> GameStats | None:
+        """Returns the stats of the game with `game_id` among the tracked players"""
+
+        return self.__stats.get_game_stats(game_id)
+
+    def get_rarest_shared_games(self, gamer_tag: str, n: int) -> list[GameStats]:
+        """Returns the stats of the `n` games of the player with `gamer_tag` whose platinum the fewest other players have"""
+
+        return self.__stats.get_rarest_shared_games(gamer_tag=gamer_tag, n=n)
+
     def save_backup(self):
         """Saves a backup of the database in a file"""
 
         with open(self.__BACKUP_FILE, "wb") as backup_file:
             pickle.dump(self.__data, backup_file)
 
+        with open(self.__CHANNELS_FILE, "wb") as channels_file:
+            pickle.dump(channel_index.get_state(), channels_file)
+
     def try_load_backup(self):
         """Tries to load a backup of the database (returns a boolean representing whether it was successful or not)"""
 
+        # The channel index is only a shortcut (lookups fall back to searching the guild), so it is optional
+        if os.path.exists(self.__CHANNELS_FILE):
+            with open(self.__CHANNELS_FILE, "rb") as channels_file:
+                channel_index.set_state(pickle.load(channels_file))
+
         if os.path.exists(self.__BACKUP_FILE):
             with open(self.__BACKUP_FILE, "rb") as backup_file:
                 self.__data = pickle.load(backup_file)
+
+            # The stats aren't backed up, they are derived from the players
+            self.__stats.rebuild(list(self.__data.values()))
+
+            return True
+        else:
+            return False
+
+    def start_loading_backup(self):
+        """Starts loading the backup in a background thread (the result is retrieved with `wait_for_backup`)"""
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.__backup_loading = executor.submit(self.try_load_backup)
+        executor.shutdown(wait=False)
+
+    async def wait_for_backup(self) -> bool:
+        """Waits for the backup to be loaded (returns a boolean representing whether it was successful or not)"""
+
+        if self.__backup_loading is None:
+            self.start_loading_backup()
+
+        return await asyncio.wrap_future(self.__backup_loading)
+
+    def add_prepared_game(
+        self, gamer_tag: str, game: Game, platinum: Platinum, banner_url: str
+    ):
+        """Stores a platinum scraped ahead of time for the player with `gamer_tag`"""
+
+        self.__prepared.setdefault(gamer_tag, dict())[game] = (platinum, banner_url)
+
+    def get_prepared_games(self, gamer_tag: str) -> dict[Game, tuple[Platinum, str]]:
+        """Returns the platinums scraped ahead of time for the player with `gamer_tag`"""
+
+        return self.__prepared.get(gamer_tag, dict())
+
+    def discard_prepared_games(self, gamer_tag: str):
+        """Forgets the platinums scraped ahead of time for the player with `gamer_tag`, in memory and in the file"""
+
+        # A backfill may be running in another process, so start from what it saved last instead of overwriting it
+        self.try_load_prepared()
+
+        if self.__prepared.pop(gamer_tag, None) is not None:
+            self.save_prepared()
+
+    def save_prepared(self):
+        """Saves the platinums scraped ahead of time in a file"""
+
+        # Write to a temporary file first so another process never reads a partially written file
+        temporary_path = f"{self.__PREPARED_FILE}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as prepared_file:
+            pickle.dump(self.__prepared, prepared_file)
+        os.replace(temporary_path, self.__PREPARED_FILE)
+
+    def try_load_prepared(self):
+        """Tries to load the platinums scraped ahead of time (returns a boolean representing whether it was successful or not)"""
+
+        if os.path.exists(self.__PREPARED_FILE):
+            with open(self.__PREPARED_FILE, "rb") as prepared_file:
+                self.__prepared = pickle.load(prepared_file)
                 return True
         else:
             return False
@@ -1,11 +1,23 @@
 """ Contains the commands the bot answers to """
 
+import asyncio
+from contextlib import nullcontext
 from datetime import datetime
 from functools import wraps
 
-from constants import CATEGORY_NAME, MANAGE_CHANNEL, UPDATE_INTERVAL
+from constants import (
+    CATEGORY_NAME,
+    GAME_OWNERS_SHOWN,
+    MANAGE_CHANNEL,
+    UPDATE_INTERVAL,
+    WATCHDOG_TOP_N,
+)
 from discord.ext import commands
+from profiling import add_profile_note, profile, should_profile
+from singleton_browser import get_browser_rss, get_page_load_stats
 from utils import create_channel, delete_channel, get_channel, send_new_banners
+from watchdog import loop_watchdog
+from workers import WorkerPool, get_worker_processes
 
 from classes.player import Player
 from .bot import bot, db
@@ -15,7 +27,7 @@ processing_command = False
 
 
 def handle_processing_flag(func):
-    """Decorator to set/unset the flag while running a command"""
+    """Decorator to set/unset the flag while running a command (and profile it if requested)"""
 
     @wraps(func)
     async def wrapper(ctx, *args, **kwargs):
@@ -25,9 +37,16 @@ def handle_processing_flag(func):
             await ctx.send("I'm already processing another command. Please wait.")
             return
 
+        # Profile if requested with `$profile` or through the environment
+        if getattr(ctx, "profile", False) or should_profile(func.__name__):
+            profiling = profile(func.__name__, report_channel=ctx.channel)
+        else:
+            profiling = nullcontext()
+
         processing_command = True
         try:
-            return await func(ctx, *args, **kwargs)
+            async with profiling:
+                return await func(ctx, *args, **kwargs)
         finally:
             processing_command = False
 
@@ -68,6 +87,18 @@ async def help(ctx):
 
 `$update` 
 - *Triggers a manual update of the banners (they update automatically every {UPDATE_INTERVAL} minutes).*
+
+`$leaderboard [platinums|hours|difficulty|unique]` 
+- *Ranks the players by platinums, hours, average difficulty or platinums no one else has (platinums by default), with the rarest platinum each player shares.*
+
+`$game <game_id>` 
+- *Shows who has the platinum of the game with `game_id` (as in its PSNProfiles link, e.g. `12345-game-name`).*
+
+`$profile <command> [arguments]` 
+- *Runs the command while profiling it and sends a summary of where the time and memory went.*
+
+`$metrics` 
+- *Shows the event loop lag, the code blocking it the most and the browser usage.*
 """
 
     await ctx.send(help_text)
@@ -106,10 +137,18 @@ async def add(ctx, new_gamer_tag: str):
         await ctx.send("Adding player...")
         channel = await create_channel(guild=ctx.guild, channel_name=player.gamer_tag)
 
+        # Use the platinums the backfill may have already scraped for this player
+        db.try_load_prepared()
+        prepared_games = db.get_prepared_games(gamer_tag=player.gamer_tag)
+
         # Get the banners changes and send the messages
-        banners = await player.get_new_platinums_banners(discord_ctx=ctx)
+        player_update = await player.get_new_platinums_banners(
+            discord_ctx=ctx, prepared_games=prepared_games
+        )
+        db.apply_player_update(player_update)
 
-        await send_new_banners(channel=channel, banners=banners)
+        await send_new_banners(channel=channel, banners=player_update.banners)
+        db.discard_prepared_games(gamer_tag=player.gamer_tag)
 
         await ctx.send("Player added. Check the new channel with the banners.")
 
@@ -150,18 +189,161 @@ async def update(ctx):
 
     manage_channel = await get_channel(guild=ctx.guild, channel_name=MANAGE_CHANNEL)
 
-    n_new_banners = 0
-    for player in db.get_players_list():
-        await manage_channel.send(f"Updating {player.gamer_tag}...")
+    players = db.get_players_list()
 
-        banners = await player.get_new_platinums_banners(discord_ctx=ctx)
-        await send_new_banners(
-            channel=await get_channel(guild=ctx.guild, channel_name=player.gamer_tag),
-            banners=banners,
+    # In worker mode every player is updated in parallel by the worker processes,
+    # and the results are applied (and sent) here in order
+    worker_pool = None
+    worker_updates = []
+    if get_worker_processes() > 0 and len(players) > 0:
+        add_profile_note(
+            "Worker mode, only the coordinator is profiled "
+            "(the scraping and rendering run in the worker processes)"
         )
+        worker_pool = WorkerPool(processes=min(get_worker_processes(), len(players)))
+        worker_updates = [
+            asyncio.ensure_future(worker_pool.update_player(player))
+            for player in players
+        ]
+
+    n_new_banners = 0
+    try:
+        for i, player in enumerate(players):
+            await manage_channel.send(f"Updating {player.gamer_tag}...")
+
+            if worker_pool is not None:
+                player_update = await worker_updates[i]
+            else:
+                player_update = await player.get_new_platinums_banners(discord_ctx=ctx)
+
+            db.apply_player_update(player_update)
+
+            await send_new_banners(
+                channel=await get_channel(
+                    guild=ctx.guild, channel_name=player.gamer_tag
+                ),
+                banners=player_update.banners,
+            )
+
+            n_new_banners += len(player_update.banners)
+    finally:
+        if worker_pool is not None:
+            # Waiting for the workers to close their browsers blocks, so do it outside the event loop
+            await asyncio.to_thread(worker_pool.shutdown)
 
-        n_new_banners += len(banners)
+    db.save_backup()
 
     await manage_channel.send(
         f"Updated banners @ {datetime.now().strftime('%H:%M of %d/%m/%Y')} **({n_new_banners} new banners)**"
     )
+
+
+@bot.command()
+@commands.check(should_answer_command)
+@handle_processing_flag
+async def leaderboard(ctx, order_by: str = "platinums"):
+    """Displays the players ranking"""
+
+    try:
+        players_stats = db.get_leaderboard(order_by=order_by)
+    except ValueError as e:
+        await ctx.send(str(e))
+        return
+
+    if len(players_stats) == 0:
+        await ctx.send(
+            "Currently there aren't any players being tracked. Add some using `$add`."
+        )
+        return
+
+    lines = []
+    for i, stats in enumerate(players_stats):
+        line = (
+            f"{i+1}. **{stats.gamer_tag}** - {stats.platinums} platinums, {stats.hours} hours, "
+            f"{stats.average_difficulty:.1f}/10 average difficulty, {stats.unique_platinums} unique"
+        )
+
+        rarest_shared = db.get_rarest_shared_games(gamer_tag=stats.gamer_tag, n=1)
+        if rarest_shared:
+            line += f", rarest shared: {rarest_shared[0].game.name} ({len(rarest_shared[0].owners)} players)"
+
+        lines.append(line)
+
+    text = f"**Leaderboard ({order_by}):**\n" + "\n".join(lines)
+
+    await ctx.send(text[:2000])  # Discord message limit
+
+
+@bot.command()
+@commands.check(should_answer_command)
+@handle_processing_flag
+async def game(ctx, game_id: str):
+    """Displays the stats of a game among the players"""
+
+    game_stats = db.get_game_stats(game_id=game_id)
+
+    if game_stats is None:
+        await ctx.send(
+            f"None of the players being tracked has the platinum of `{game_id}`."
+        )
+        return
+
+    n_players = len(db.get_players_list())
+    # First to earn it first
+    owners = sorted(game_stats.owners, key=game_stats.owners.get)
+    owners_text = ", ".join(owners[:GAME_OWNERS_SHOWN])
+    if len(owners) > GAME_OWNERS_SHOWN:
+        owners_text += f" and {len(owners) - GAME_OWNERS_SHOWN} more"
+
+    text = f"""**{game_stats.game.name}** ({game_stats.game.console.name})
+- *Difficulty:* {"-" if game_stats.difficulty is None else f"{game_stats.difficulty}/10"}
+- *Hours:* {"-" if game_stats.hours is None else game_stats.hours}
+- *Platinum owned by {len(owners)}/{n_players} players ({len(owners) / n_players:.0%}):* {owners_text}
+- *First to earn it:* {game_stats.first_owner}"""
+
+    await ctx.send(text[:2000])  # Discord message limit
+
+
+@bot.command(name="profile")
+@commands.check(should_answer_command)
+async def profile_command(ctx, command_name: str, *args):
+    """Runs a command while profiling it"""
+
+    command = bot.get_command(command_name)
+
+    if command is None or command is ctx.command:
+        await ctx.send(f"There isn't a `${command_name}` command to profile.")
+        return
+
+    # Picked up by `handle_processing_flag`
+    ctx.profile = True
+    await ctx.invoke(command, *args)
+
+
+@bot.command()
+@commands.check(should_answer_command)
+async def metrics(ctx):
+    """Displays the event loop and browser metrics"""
+
+    # Not flagged as processing, so it can be checked while another command is slow
+
+    average_lag, max_lag = loop_watchdog.get_lag()
+    offenders = [
+        f"- `{call_site}`: {count} times (longest {longest_block:.2f}s)"
+        for call_site, count, longest_block in loop_watchdog.get_worst_offenders(
+            WATCHDOG_TOP_N
+        )
+    ] or ["- *None*"]
+
+    browser_rss = get_browser_rss()
+    browser_memory = (
+        "not running" if browser_rss is None else f"{browser_rss / 1024 / 1024:.0f} MB"
+    )
+
+    text = f"""**Event loop lag:** {average_lag * 1000:.1f} ms average, {max_lag * 1000:.1f} ms max
+**Blocking the event loop the most:**
+{chr(10).join(offenders)}
+**Browser memory:** {browser_memory}
+**Page loads:** {get_page_load_stats()}"""
+
+    await ctx.send(text[:2000])  # Discord message limit
@@ -1,7 +1,12 @@
 """ Contains the methods corresponding to bot events """
 
+import asyncio
+
+from constants import MANAGE_CHANNEL
+from discord import Guild, TextChannel
 from discord.ext import commands
-from utils import create_bot_category, create_channel, delete_bot_category
+from utils import index_channel, sync_bot_channels, unindex_channel
+from watchdog import loop_watchdog
 
 from .bot import bot, db
 from .tasks import update_banners
@@ -20,23 +25,18 @@ async def on_ready():
     if not already_started_up:
         print(f"Logged in as {bot.user}, starting up...")
 
+        loop_watchdog.start()
+
         # Only create the channels and etc if there isn't a backup
         # (for example in a power cut, the bot shouldn't recreate everything, just resume activity from the previous state)
-        if not db.try_load_backup():
-            for guild in bot.guilds:
-
-                # Clean up
-                await delete_bot_category(guild)
-
-                print(f"Initializing guild '{guild.name}'")
-
-                # Create category and manage channel
-                await create_bot_category(guild)
-                channel = await create_channel(
-                    guild=guild, channel_name="Manage", allow_user_messages=True
-                )
-
-                # Display hello message and commands
+        if not await db.wait_for_backup():
+            manage_channels = await asyncio.gather(
+                *[initialize_guild(guild) for guild in bot.guilds]
+            )
+
+            # Display hello message and commands
+            # (one at a time, since the bot only processes one command at a time)
+            for channel in manage_channels:
                 ctx = await bot.get_context(
                     await channel.send("Hello! Ready to track the players...")
                 )
@@ -49,6 +49,38 @@ async def on_ready():
         already_started_up = True
 
 
+async def initialize_guild(guild: Guild) -> TextChannel:
+    """Leaves only the manage channel in the bot category, returning it"""
+
+    print(f"Initializing guild '{guild.name}'")
+
+    # Clean up and create category and manage channel (channels that already match are kept)
+    channels = await sync_bot_channels(guild=guild, channels={MANAGE_CHANNEL: True})
+
+    return channels[MANAGE_CHANNEL]
+
+
+@bot.event
+async def on_guild_channel_create(channel):
+    """Keeps the channel index up to date"""
+
+    index_channel(channel)
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Keeps the channel index up to date (e.g. the channel was renamed or moved)"""
+
+    index_channel(after)
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Keeps the channel index up to date"""
+
+    unindex_channel(channel)
+
+
 @bot.event
 async def on_command_error(ctx, error):
     """Displays help message when there is an error"""
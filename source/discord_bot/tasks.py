@@ -1,15 +1,22 @@
 """ Contains the bot scheduled tasks """
 
+import asyncio
 import time
+from datetime import datetime, timezone
 
-from constants import MANAGE_CHANNEL, UPDATE_INTERVAL
+from constants import BROWSER_PREWARM, MANAGE_CHANNEL, UPDATE_INTERVAL
 from discord.ext import tasks
+from singleton_browser import prewarm_browser
 from utils import get_channel
+from workers import get_worker_processes
 
 from .bot import bot, db
 
 LAST_UPDATE = None
 
+# The event loop only keeps a weak reference to the tasks, so keep the prewarm one alive here
+_prewarm_task: asyncio.Task | None = None
+
 
 @tasks.loop(minutes=UPDATE_INTERVAL)
 async def update_banners():
@@ -17,6 +24,8 @@ async def update_banners():
 
     global LAST_UPDATE
 
+    schedule_browser_prewarm()
+
     current_time = time.time()
 
     if LAST_UPDATE is not None and current_time - LAST_UPDATE < 60:  # s
@@ -32,6 +41,39 @@ async def update_banners():
             ctx = await bot.get_context(
                 await channel.send("Triggering automatic update...")
             )
-            await bot.get_command("update").invoke(ctx)
+            await bot.get_command("update").invoke(ctx)  # Saves the backup
+
+
+def schedule_browser_prewarm():
+    """Schedules the browser launch `BROWSER_PREWARM` minutes before the next update"""
+
+    next_update = update_banners.next_iteration
+
+    # In worker mode the browsers run in the worker processes, and without players there is nothing to scrape
+    if (
+        next_update is None
+        or get_worker_processes() > 0
+        or len(db.get_players_list()) == 0
+    ):
+        return
+
+    delay = (next_update - datetime.now(timezone.utc)).total_seconds() - BROWSER_PREWARM * 60
+
+    asyncio.get_running_loop().call_later(max(delay, 0), start_browser_prewarm)
+
+
+def start_browser_prewarm():
+    """Starts launching the browser in the background"""
+
+    global _prewarm_task
+
+    _prewarm_task = asyncio.create_task(try_prewarm_browser())
+
+
+async def try_prewarm_browser():
+    """Launches the browser ahead of the update (if it fails, the update launches it when it needs it)"""
 
-    db.save_backup()
+    try:
+        await prewarm_browser()
+    except Exception as e:
+        print(f"Couldn't prewarm the browser ({e})")
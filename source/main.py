@@ -1,13 +1,13 @@
 import os
 
 # Commands and events aren't used but need to be imported to register
-from discord_bot.bot import bot
+from discord_bot.bot import bot, db
 from discord_bot.events import *
 from discord_bot.commands import *
 from discord_bot.tasks import *
 from dotenv import load_dotenv
 
-from singleton_browser import close_browser_instance
+from singleton_browser import kill_browser_instance
 
 load_dotenv()
 
@@ -15,7 +15,11 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 
 if __name__ == "__main__":
+    # Load the backup while the bot connects, `on_ready` waits for it
+    db.start_loading_backup()
+
     try:
         bot.run(BOT_TOKEN)
-    except:
-        close_browser_instance()
+    finally:
+        # The event loop is already closed here, so the browser can't be closed gracefully
+        kill_browser_instance()
@@ -0,0 +1,204 @@
+""" Contains the opt-in profiling of the commands """
+
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from constants import PROFILE_TOP_N, PROFILES_DIR, SLOW_CALLBACK_DURATION
+
+PROFILE_VARIABLE = "PROFILE_COMMANDS"
+""" Environment variable with the comma separated names of the commands to always profile (or "all") """
+
+HOT_PATHS = ["get_new_platinums_banners", "create_platinum_banner", "save_backup"]
+""" Functions that always get their own section in the reports """
+
+# cProfile can't run nested, so only the outermost profiled command is profiled
+_profiling = False
+
+# Caveats about what the running profile covers, added to its report
+_notes: list[str] = []
+
+
+def should_profile(command_name: str) -> bool:
+    """Checks if `command_name` should be profiled according to the environment"""
+
+    commands = {
+        name.strip() for name in os.getenv(PROFILE_VARIABLE, "").split(",") if name
+    }
+
+    return "all" in commands or command_name in commands
+
+
+def add_profile_note(note: str):
+    """Adds `note` to the report of the running profile (if there is one)"""
+
+    if _profiling and note not in _notes:
+        _notes.append(note)
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Collects the slow callbacks the asyncio debug mode logs"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.slow_callbacks: list[str] = []
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+
+        if " took " in message:
+            self.slow_callbacks.append(message)
+
+
+@asynccontextmanager
+async def profile(name: str, report_channel=None):
+    """
+    Profiles the code inside the context with cProfile, tracemalloc and the asyncio slow callback detector.
+    A report is written to `PROFILES_DIR` and a summary is sent to `report_channel` (if given).
+    """
+
+    global _profiling
+
+    if _profiling:
+        yield
+        return
+
+    _profiling = True
+    _notes.clear()
+
+    loop = asyncio.get_running_loop()
+    loop_debug = loop.get_debug()
+    loop_slow_callback_duration = loop.slow_callback_duration
+
+    slow_callback_handler = _SlowCallbackHandler()
+    asyncio_logger = logging.getLogger("asyncio")
+    asyncio_logger.addHandler(slow_callback_handler)
+    loop.set_debug(True)
+    loop.slow_callback_duration = SLOW_CALLBACK_DURATION
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    profiler = cProfile.Profile()
+    start_time = time.perf_counter()
+    profiler.enable()
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        duration = time.perf_counter() - start_time
+
+        snapshot = tracemalloc.take_snapshot()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        loop.set_debug(loop_debug)
+        loop.slow_callback_duration = loop_slow_callback_duration
+        asyncio_logger.removeHandler(slow_callback_handler)
+
+        _profiling = False
+
+        report_path, summary = _write_report(
+            name,
+            duration,
+            profiler,
+            snapshot,
+            peak_memory,
+            slow_callback_handler.slow_callbacks,
+            list(_notes),
+        )
+        print(f"Profile of '{name}' written to {report_path}")
+
+        if report_channel is not None:
+            await report_channel.send(summary)
+
+
+def _write_report(
+    name: str,
+    duration: float,
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+    peak_memory: int,
+    slow_callbacks: list[str],
+    notes: list[str],
+) -> tuple[str, str]:
+    """Writes the profiling report file, returning its path and a short summary"""
+
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    report_path = os.path.join(
+        PROFILES_DIR, f"{name}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+    )
+
+    stats_output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+
+    #################### Report ####################
+    with open(report_path, "w") as report_file:
+        report_file.write(f"Profile of '{name}' ({duration:.2f} seconds)\n\n")
+        for note in notes:
+            report_file.write(f"Note: {note}\n\n")
+
+        report_file.write("#################### Hot paths ####################\n")
+        stats.print_stats("|".join(HOT_PATHS))
+
+        report_file.write(stats_output.getvalue())
+        stats_output.truncate(0)
+        stats_output.seek(0)
+
+        report_file.write("#################### Cumulative time ####################\n")
+        stats.print_stats(PROFILE_TOP_N * 3)
+        report_file.write(stats_output.getvalue())
+        stats_output.truncate(0)
+        stats_output.seek(0)
+
+        report_file.write("#################### Own time ####################\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_TOP_N * 3)
+        report_file.write(stats_output.getvalue())
+
+        report_file.write("\n#################### Memory ####################\n")
+        report_file.write(f"Peak: {peak_memory / 1024 / 1024:.1f} MB\n")
+        for allocation in snapshot.statistics("lineno")[: PROFILE_TOP_N * 3]:
+            report_file.write(f"{allocation}\n")
+
+        report_file.write("\n#################### Slow callbacks ####################\n")
+        report_file.write("\n".join(slow_callbacks) or "None")
+        report_file.write("\n")
+
+    #################### Summary ####################
+    entries = sorted(
+        stats.stats.items(), key=lambda entry: entry[1][3], reverse=True
+    )  # Each entry is (file, line, function): (primitive calls, calls, own time, cumulative time, callers)
+
+    hot_paths = [
+        f"- `{function}`: {cumulative_time:.2f}s ({calls} calls)"
+        for (_, _, function), (_, calls, _, cumulative_time, _) in entries
+        if function.split(".")[-1] in HOT_PATHS
+    ] or ["- *Not called*"]
+    top_functions = [
+        f"- `{function}` ({os.path.basename(file)}:{line}): {cumulative_time:.2f}s"
+        for (file, line, function), (_, _, _, cumulative_time, _) in entries
+        if not re.match(r"^<.*>$", function)  # Skip built-ins and module bodies
+    ][:PROFILE_TOP_N]
+    note_lines = [f"*Note: {note}*\n" for note in notes]
+
+    summary = f"""**Profile of `{name}`** ({duration:.2f} seconds, peak memory {peak_memory / 1024 / 1024:.1f} MB, {len(slow_callbacks)} slow callbacks)
+{"".join(note_lines)}**Hot paths:**
+{chr(10).join(hot_paths)}
+**Top {PROFILE_TOP_N} (cumulative):**
+{chr(10).join(top_functions)}
+*Full report: `{report_path}`*"""
+
+    return report_path, summary[:2000]  # Discord message limit
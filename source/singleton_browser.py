@@ -1,21 +1,95 @@
-from constants import CHROMIUM_RASPBERRY_PATH
-from pyppeteer import launch
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from constants import (
+    BROWSER_ALLOWED_DOMAINS,
+    BROWSER_ALLOWED_RESOURCE_TYPES,
+    BROWSER_IDLE_TIMEOUT,
+    BROWSER_MAX_RSS,
+    CHROMIUM_RASPBERRY_PATH,
+)
 from utils import running_in_raspberry_pi
 
+
+class PageLoadStats:
+    """Keeps track of the cost of loading pages"""
+
+    def __init__(self) -> None:
+
+        self.pages = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.requests = 0
+        self.blocked_requests = 0
+
+    def add(self, other: "PageLoadStats"):
+        """Adds the stats of `other` to these"""
+
+        self.pages += other.pages
+        self.seconds += other.seconds
+        self.bytes += other.bytes
+        self.requests += other.requests
+        self.blocked_requests += other.blocked_requests
+
+    def __str__(self) -> str:
+        return (
+            f"{self.pages} pages in {self.seconds:.2f} seconds, {self.bytes / 1024:.0f} KB transferred, "
+            f"{self.requests} requests ({self.blocked_requests} blocked)"
+        )
+
+
 _browser_instance = None
 _page = None
 
+_current_page_load = PageLoadStats()
+_total_page_loads = PageLoadStats()
+
+_pages_in_use = 0
+_last_used = 0.0
+_idle_watcher: asyncio.Task | None = None
+
+
+@asynccontextmanager
+async def browser_page():
+    """
+    Yields the single shared instance of the browser page.
+    The browser isn't closed for being idle while the page is in use.
+    """
+
+    global _pages_in_use
+    global _last_used
+
+    page = await get_browser_page()
+
+    _pages_in_use += 1
+    try:
+        yield page
+    finally:
+        _pages_in_use -= 1
+        _last_used = time.monotonic()
+
 
 async def get_browser_page():
     """
     Returns a single shared instance of the browser page.
-    Launches the browser if it is not already initialized.
+    Launches the browser if it is not already initialized (or restarts it if it crashed or uses too much memory).
     """
 
     global _browser_instance
     global _page
+    global _last_used
+    global _idle_watcher
+
+    if _browser_instance is not None and not _is_browser_healthy():
+        await close_browser_instance()
 
     if _browser_instance is None and _page is None:
+        # Imported here so pyppeteer is only loaded when something is scraped
+        from pyppeteer import launch
+
         launch_options = {
             "headless": True,
         }
@@ -30,16 +104,201 @@ async def get_browser_page():
 
         _browser_instance = await launch(**launch_options)
         _page = await _browser_instance.newPage()
+        await _setup_page(_page)
+
+        print(f"Browser launched ({_format_rss(get_browser_rss())})")
+
+    _last_used = time.monotonic()
+
+    if _idle_watcher is None or _idle_watcher.done():
+        _idle_watcher = asyncio.create_task(_close_when_idle())
 
     return _page
 
 
+async def load_page(page, url: str):
+    """Navigates `page` to `url`, reporting the time it took and the bytes transferred"""
+
+    global _current_page_load
+
+    _current_page_load = PageLoadStats()
+
+    start_time = time.perf_counter()
+    await page.goto(url)
+
+    _current_page_load.pages = 1
+    _current_page_load.seconds = time.perf_counter() - start_time
+    _total_page_loads.add(_current_page_load)
+
+    print(f"Loaded {url}: {_current_page_load}")
+
+
+def get_page_load_stats() -> PageLoadStats:
+    """Returns the accumulated stats of every page loaded so far"""
+
+    return _total_page_loads
+
+
+async def prewarm_browser():
+    """Launches the browser ahead of time so it is ready when it is needed"""
+
+    await get_browser_page()
+
+
 async def close_browser_instance():
     """
     Closes the shared browser instance if it exists.
     """
 
     global _browser_instance
-    if _browser_instance:
-        await _browser_instance.close()
-        _browser_instance = None
+    global _page
+
+    browser = _browser_instance
+    rss = get_browser_rss()
+
+    # Forget the browser before closing it, so whoever asks for a page meanwhile launches a new one
+    _browser_instance = None
+    _page = None
+
+    if browser:
+        try:
+            await browser.close()
+        except Exception as e:
+            # The browser may have crashed, make sure its process is gone
+            print(f"Couldn't close the browser ({e}), killing it")
+            if browser.process.poll() is None:
+                browser.process.kill()
+
+        print(f"Browser closed ({_format_rss(rss)})")
+
+
+def kill_browser_instance():
+    """
+    Kills the shared browser process if it exists (for when there is no event loop left to close it).
+    """
+
+    global _browser_instance
+    global _page
+
+    if _browser_instance and _browser_instance.process.poll() is None:
+        _browser_instance.process.kill()
+
+    _browser_instance = None
+    _page = None
+
+
+def forget_browser_instance():
+    """
+    Forgets the shared browser without closing it (for a new process that must not use a browser it doesn't own).
+    """
+
+    global _browser_instance
+    global _page
+    global _idle_watcher
+    global _pages_in_use
+
+    _browser_instance = None
+    _page = None
+    _idle_watcher = None
+    _pages_in_use = 0
+
+
+def get_browser_rss() -> int | None:
+    """Returns the resident memory (in bytes) of the browser and its child processes, if it can be measured"""
+
+    if _browser_instance is None or not os.path.isdir("/proc"):
+        return None
+
+    # Map every process to its parent and memory usage to find the whole browser process tree
+    children = dict()
+    rss = dict()
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                # The fields after the process name are: state, ppid, ..., rss (the 22nd)
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+
+        children.setdefault(int(fields[1]), []).append(int(pid))
+        rss[int(pid)] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+
+    total = 0
+    pending = [_browser_instance.process.pid]
+    while pending:
+        pid = pending.pop()
+        total += rss.get(pid, 0)
+        pending += children.get(pid, [])
+
+    return total
+
+
+async def _setup_page(page):
+    """Blocks the requests the scraping doesn't need and starts measuring the bytes transferred"""
+
+    await page.setRequestInterception(True)
+    page.on("request", _intercept_request)
+
+    # Pyppeteer doesn't expose the transferred size, so read it from the DevTools protocol
+    page._client.on("Network.loadingFinished", _count_transferred_bytes)
+
+
+def _intercept_request(request):
+    """Lets through the requests in the allow-list and aborts the rest"""
+
+    _current_page_load.requests += 1
+
+    hostname = urlparse(request.url).hostname or ""
+    allowed_domain = any(
+        hostname == domain or hostname.endswith(f".{domain}")
+        for domain in BROWSER_ALLOWED_DOMAINS
+    )
+
+    if request.resourceType in BROWSER_ALLOWED_RESOURCE_TYPES and allowed_domain:
+        asyncio.ensure_future(request.continue_())
+    else:
+        _current_page_load.blocked_requests += 1
+        asyncio.ensure_future(request.abort())
+
+
+def _count_transferred_bytes(event: dict):
+    _current_page_load.bytes += int(event.get("encodedDataLength", 0))
+
+
+def _is_browser_healthy() -> bool:
+    """Checks if the browser is still running and within its memory limit"""
+
+    if _browser_instance.process.poll() is not None or _page.isClosed():
+        print("Browser crashed, restarting it")
+        return False
+
+    # Don't restart the browser under someone using it
+    if _pages_in_use > 0:
+        return True
+
+    rss = get_browser_rss()
+    if rss is not None and rss > BROWSER_MAX_RSS:
+        print(f"Browser is using too much memory ({_format_rss(rss)}), restarting it")
+        return False
+
+    return True
+
+
+async def _close_when_idle():
+    """Closes the browser once it has been unused for `BROWSER_IDLE_TIMEOUT` minutes"""
+
+    idle_timeout = BROWSER_IDLE_TIMEOUT * 60  # s
+
+    while _browser_instance is not None:
+        await asyncio.sleep(min(30, idle_timeout))
+
+        if _pages_in_use == 0 and time.monotonic() - _last_used >= idle_timeout:
+            print(f"Browser idle for {BROWSER_IDLE_TIMEOUT} minutes, closing it")
+            await close_browser_instance()
+
+
+def _format_rss(rss: int | None) -> str:
+    return "memory unknown" if rss is None else f"{rss / 1024 / 1024:.0f} MB"
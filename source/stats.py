@@ -0,0 +1,202 @@
+""" Contains the aggregated stats of the tracked players and their games """
+
+from dataclasses import dataclass, field
+from itertools import islice
+
+from classes.game import Game
+from classes.platinum import Platinum
+from classes.player import Player
+
+LEADERBOARD_ORDERS = ["platinums", "hours", "difficulty", "unique"]
+""" The stats the leaderboard can be ordered by """
+
+
+@dataclass(slots=True)
+class PlayerStats:
+    """Aggregates of the platinums of a player"""
+
+    gamer_tag: str
+
+    platinums: int = 0
+
+    # Only the platinums with a guide have difficulty and hours
+    rated_platinums: int = 0
+
+    difficulty_sum: int = 0
+
+    hours: int = 0
+
+    # Ids of the games of the platinums, grouped by the number of tracked players who have the platinum
+    games_by_owners: dict[int, set[str]] = field(default_factory=dict)
+
+    @property
+    def average_difficulty(self) -> float:
+        return self.difficulty_sum / self.rated_platinums if self.rated_platinums else 0.0
+
+    @property
+    def unique_platinums(self) -> int:
+        """Number of platinums no other tracked player has"""
+
+        return len(self.games_by_owners.get(1, ()))
+
+    def get_rarest_shared_games(self, n: int) -> list[str]:
+        """Returns the ids of the `n` games whose platinum the fewest other tracked players also have"""
+
+        # There are as many groups as tracked players at most, but a group can hold most of the library,
+        # so only take what is needed from each one
+        games = []
+        for n_owners in sorted(self.games_by_owners):
+            if n_owners > 1:
+                games += islice(self.games_by_owners[n_owners], n - len(games))
+
+            if len(games) >= n:
+                break
+
+        return games
+
+
+@dataclass(slots=True)
+class GameStats:
+    """Aggregates of the platinums of a game among the tracked players"""
+
+    game: Game
+
+    difficulty: int | None = None
+
+    hours: int | None = None
+
+    # Gamer tags of the players who have the platinum, with the date they earned it (see `Platinum.earned_on`)
+    owners: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def first_owner(self) -> str | None:
+        """Gamer tag of the first tracked player who earned the platinum"""
+
+        return min(self.owners, key=self.owners.get, default=None)
+
+
+class Stats:
+    """
+    Keeps the aggregates of every player and game up to date as platinums are recorded,
+    so the leaderboard and the game queries don't have to go through every library
+    """
+
+    def __init__(self) -> None:
+
+        self.__players: dict[str, PlayerStats] = dict()  # Key is the gamer tag
+        self.__games: dict[str, GameStats] = dict()  # Key is the game id
+
+    def add_player(self, gamer_tag: str):
+        """Starts aggregating the platinums of the player with `gamer_tag`"""
+
+        self.__players.setdefault(gamer_tag, PlayerStats(gamer_tag=gamer_tag))
+
+    def add_platinum(self, gamer_tag: str, game: Game, platinum: Platinum):
+        """Records that the player with `gamer_tag` earned `platinum` in `game`"""
+
+        game_stats = self.__games.get(game.id)
+        if game_stats is None:
+            game_stats = self.__games[game.id] = GameStats(game=game)
+
+        if gamer_tag in game_stats.owners:
+            return
+
+        self.add_player(gamer_tag)
+        player_stats = self.__players[gamer_tag]
+
+        player_stats.platinums += 1
+        if platinum.difficulty is not None and platinum.hours is not None:
+            player_stats.rated_platinums += 1
+            player_stats.difficulty_sum += platinum.difficulty
+            player_stats.hours += platinum.hours
+
+            game_stats.difficulty = platinum.difficulty
+            game_stats.hours = platinum.hours
+
+        game_stats.owners[gamer_tag] = platinum.earned_on
+        self.__regroup(game_stats, previous_n_owners=len(game_stats.owners) - 1)
+
+    def remove_player(self, player: Player):
+        """Stops aggregating the platinums of `player`"""
+
+        for game in player.games_with_platinum:
+            game_stats = self.__games.get(game.id)
+            if game_stats is None or player.gamer_tag not in game_stats.owners:
+                continue
+
+            del game_stats.owners[player.gamer_tag]
+
+            if len(game_stats.owners) == 0:
+                del self.__games[game.id]
+            else:
+                self.__regroup(game_stats, previous_n_owners=len(game_stats.owners) + 1)
+
+        self.__players.pop(player.gamer_tag, None)
+
+    def rebuild(self, players: list[Player]):
+        """Recomputes every aggregate from scratch (e.g. after loading a backup)"""
+
+        self.__players = dict()
+        self.__games = dict()
+
+        for player in players:
+            self.add_player(player.gamer_tag)
+
+            for game, platinum in player.games_with_platinum.items():
+                if platinum is not None:
+                    self.add_platinum(player.gamer_tag, game, platinum)
+
+    def get_leaderboard(self, order_by: str, size: int) -> list[PlayerStats]:
+        """Returns the stats of the best `size` players according to `order_by` (one of `LEADERBOARD_ORDERS`)"""
+
+        if order_by not in LEADERBOARD_ORDERS:
+            raise ValueError(
+                f"The leaderboard can only be ordered by {', '.join(LEADERBOARD_ORDERS)}."
+            )
+
+        match order_by:
+            case "platinums":
+                key = lambda stats: stats.platinums
+            case "hours":
+                key = lambda stats: stats.hours
+            case "difficulty":
+                key = lambda stats: stats.average_difficulty
+            case "unique":
+                key = lambda stats: stats.unique_platinums
+
+        return sorted(self.__players.values(), key=key, reverse=True)[:size]
+
+    def get_rarest_shared_games(self, gamer_tag: str, n: int) -> list[GameStats]:
+        """Returns the stats of the `n` games of the player with `gamer_tag` that the fewest other players have"""
+
+        player_stats = self.__players.get(gamer_tag)
+        if player_stats is None:
+            return []
+
+        return [
+            self.__games[game_id]
+            for game_id in player_stats.get_rarest_shared_games(n)
+        ]
+
+    def get_game_stats(self, game_id: str) -> GameStats | None:
+        """Returns the stats of the game with `game_id`, if any tracked player has its platinum"""
+
+        return self.__games.get(game_id)
+
+    def __regroup(self, game_stats: GameStats, previous_n_owners: int):
+        """Moves the game to its new number of owners in the groups of each of its owners"""
+
+        game_id = game_stats.game.id
+        n_owners = len(game_stats.owners)
+
+        for gamer_tag in game_stats.owners:
+            games_by_owners = self.__players[gamer_tag].games_by_owners
+
+            # The player who just got the platinum isn't in the previous group
+            previous_group = games_by_owners.get(previous_n_owners)
+            if previous_group is not None:
+                previous_group.discard(game_id)
+                if len(previous_group) == 0:
+                    del games_by_owners[previous_n_owners]
+
+            games_by_owners.setdefault(n_owners, set()).add(game_id)
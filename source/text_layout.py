@@ -0,0 +1,125 @@
+""" Contains the layout of the text drawn on the banners """
+
+from PIL import ImageFont
+from PIL.ImageFont import FreeTypeFont
+
+FONT_PATH = "assets/PixelifySans-VariableFont_wght.ttf"
+
+LINE_SPACING = 4  # px, same as Pillow's default for multiline text
+
+
+class TextLayout:
+    """
+    Lays out the text drawn on the banners.
+    The fonts and the width of each word are cached per font size, since the same words repeat across banners.
+    """
+
+    __MAX_CACHED_WORDS = 10_000
+
+    def __init__(self, font_path: str = FONT_PATH) -> None:
+
+        self.__font_path = font_path
+        self.__fonts: dict[int, FreeTypeFont] = dict()  # Key is the font size
+        self.__word_widths: dict[tuple[int, str], float] = dict()
+
+    def font(self, size: int) -> FreeTypeFont:
+        """Returns the banner font with `size`"""
+
+        font = self.__fonts.get(size)
+
+        if font is None:
+            font = ImageFont.truetype(self.__font_path, size)
+            self.__fonts[size] = font
+
+        return font
+
+    def word_width(self, word: str, size: int) -> float:
+        """Returns the width of `word` with the font of `size`"""
+
+        key = (size, word)
+        width = self.__word_widths.get(key)
+
+        if width is None:
+            if len(self.__word_widths) >= self.__MAX_CACHED_WORDS:
+                self.__word_widths.clear()
+
+            width = self.font(size).getlength(word)
+            self.__word_widths[key] = width
+
+        return width
+
+    def line_height(self, size: int) -> int:
+        """Returns the height of a line of text with the font of `size`"""
+
+        ascent, descent = self.font(size).getmetrics()
+
+        return ascent + descent
+
+    def wrap(self, text: str, size: int, max_width: float) -> list[str]:
+        """
+        Splits `text` in lines with the maximum possible of words that don't exceed `max_width`
+        (a single word wider than `max_width` gets its own line)
+        """
+
+        return self.__wrap(text, size, max_width)[0]
+
+    def fit(
+        self,
+        text: str,
+        max_width: float,
+        max_height: float,
+        max_size: int,
+        min_size: int,
+    ) -> tuple[FreeTypeFont, str]:
+        """
+        Returns the biggest font (between `min_size` and `max_size`) with which `text` fits the box,
+        along with the text wrapped to the box width
+        """
+
+        for size in range(max_size, min_size, -2):
+            lines, widest_line = self.__wrap(text, size, max_width)
+            height = (
+                len(lines) * self.line_height(size) + (len(lines) - 1) * LINE_SPACING
+            )
+
+            if widest_line <= max_width and height <= max_height:
+                return self.font(size), "\n".join(lines)
+
+        # Nothing fit, use the smallest font
+        return self.font(min_size), "\n".join(self.wrap(text, min_size, max_width))
+
+    def __wrap(
+        self, text: str, size: int, max_width: float
+    ) -> tuple[list[str], float]:
+        """Greedily wraps `text` in a single pass, returning the lines and the width of the widest one"""
+
+        space_width = self.word_width(" ", size)
+
+        lines = []
+        widest_line = 0
+        current_line = []
+        current_width = 0
+
+        for word in text.split():
+            width = self.word_width(word, size)
+
+            if not current_line:
+                current_line = [word]
+                current_width = width
+            elif current_width + space_width + width <= max_width:
+                current_line.append(word)
+                current_width += space_width + width
+            else:
+                lines.append(" ".join(current_line))
+                widest_line = max(widest_line, current_width)
+                current_line = [word]
+                current_width = width
+
+        if current_line:
+            lines.append(" ".join(current_line))
+            widest_line = max(widest_line, current_width)
+
+        return lines, widest_line
+
+
+text_layout = TextLayout()
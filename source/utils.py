@@ -1,11 +1,17 @@
 """ Contains async utility functions """
 
+import asyncio
 from io import BytesIO
+from typing import TYPE_CHECKING
 
 import discord
-from constants import CATEGORY_NAME
+from channel_index import channel_index
+from constants import CATEGORY_NAME, DISCORD_CONCURRENCY, DISCORD_RETRIES
 from discord import CategoryChannel, Guild, TextChannel
-from PIL.Image import Image
+from discord.abc import GuildChannel
+
+if TYPE_CHECKING:
+    from PIL.Image import Image
 
 #################### Async ####################
 
@@ -31,30 +37,22 @@ async def create_channel(
 
     channel_name = format_channel_name(channel_name)
 
-    category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
-
-    # Bot category didn't exist, create it
-    if category is None:
-        category = await create_bot_category(guild=guild)
-
-    existing_channel = discord.utils.get(category.channels, name=channel_name)
+    existing_channel = find_channel(guild=guild, channel_name=channel_name)
 
     if existing_channel is None:
 
-        # Set permissions of the channel
-        # The bot will have an interactive channel and the rest are only informative so the user can't write there
-        overwrites = {
-            guild.default_role: discord.PermissionOverwrite(
-                send_messages=allow_user_messages,
-                view_channel=True,
-                read_message_history=True,
-            ),
-            guild.me: discord.PermissionOverwrite(send_messages=True),
-        }
+        category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
+
+        # Bot category didn't exist, create it
+        if category is None:
+            category = await create_bot_category(guild=guild)
 
         existing_channel = await guild.create_text_channel(
-            channel_name, category=category, overwrites=overwrites
+            channel_name,
+            category=category,
+            overwrites=channel_overwrites(guild, allow_user_messages),
         )
+        channel_index.set(guild.id, channel_name, existing_channel.id)
         print(f"Channel '{channel_name}' was created")
     else:
         print(f"Channel '{channel_name}' already exists, skipping creation")
@@ -62,20 +60,95 @@ async def create_channel(
     return existing_channel
 
 
-async def delete_bot_category(guild: Guild):
-    """Deletes the bot category and all the channels"""
+async def sync_bot_channels(
+    guild: Guild, channels: dict[str, bool]
+) -> dict[str, TextChannel]:
+    """
+    Makes the bot category of `guild` contain exactly `channels` (each name maps to whether users can send messages),
+    deleting and creating channels concurrently and leaving the ones that already match untouched
+    """
+
+    channels = {
+        format_channel_name(channel_name): allow_user_messages
+        for channel_name, allow_user_messages in channels.items()
+    }
+
+    category = await create_bot_category(guild)
+
+    existing_channels = dict()
+    to_delete = []
+    for channel in category.channels:
+        if channel.name in channels and has_expected_permissions(
+            channel, allow_user_messages=channels[channel.name]
+        ):
+            existing_channels[channel.name] = channel
+        else:
+            to_delete.append(channel)
 
-    category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
+    to_create = [
+        channel_name for channel_name in channels if channel_name not in existing_channels
+    ]
 
-    if category is not None:
+    if not to_delete and not to_create:
+        print(f"Channels of guild '{guild.name}' are already up to date")
+    else:
+        await run_concurrently(
+            [lambda channel=channel: channel.delete() for channel in to_delete]
+        )
 
-        for channel in category.channels:
-            await channel.delete()
+        created_channels = await run_concurrently(
+            [
+                lambda channel_name=channel_name: guild.create_text_channel(
+                    channel_name,
+                    category=category,
+                    overwrites=channel_overwrites(guild, channels[channel_name]),
+                )
+                for channel_name in to_create
+            ]
+        )
+        existing_channels.update(zip(to_create, created_channels))
+
+        print(
+            f"Channels of guild '{guild.name}' synced ({len(to_delete)} deleted, {len(to_create)} created)"
+        )
+
+    for channel_name, channel in existing_channels.items():
+        channel_index.set(guild.id, channel_name, channel.id)
+
+    return existing_channels
 
-        await category.delete()
-        print(f"Category '{CATEGORY_NAME}' was deleted")
-    else:
-        print(f"Category '{CATEGORY_NAME}' didn't exist, skipping deletion")
+
+async def run_concurrently(operations: list) -> list:
+    """
+    Runs the Discord `operations` (functions returning an awaitable) concurrently,
+    at most `DISCORD_CONCURRENCY` at a time and retrying the rate limited ones
+    """
+
+    semaphore = asyncio.Semaphore(DISCORD_CONCURRENCY)
+
+    async def run(operation):
+        async with semaphore:
+            return await retry_when_rate_limited(operation)
+
+    return await asyncio.gather(*[run(operation) for operation in operations])
+
+
+async def retry_when_rate_limited(operation):
+    """
+    Runs the Discord `operation`, waiting and retrying it when it is rate limited for too long.
+    discord.py already waits out the usual rate limits, it only gives up (raising `RateLimited`)
+    when the wait would be longer than its `max_ratelimit_timeout`.
+    """
+
+    for attempt in range(DISCORD_RETRIES + 1):
+        try:
+            return await operation()
+        except discord.RateLimited as e:
+            if attempt == DISCORD_RETRIES:
+                raise
+
+            print(f"Rate limited by Discord, retrying in {e.retry_after:.1f} seconds")
+            await asyncio.sleep(e.retry_after)
 
 
 async def delete_channel(guild: Guild, channel_name: str) -> TextChannel:
@@ -83,18 +156,11 @@ async def delete_channel(guild: Guild, channel_name: str) -> TextChannel:
 
     channel_name = format_channel_name(channel_name)
 
-    category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
-
-    if category is None:
-        print(
-            f"Category '{CATEGORY_NAME}' didn't exist, skipping channel '{channel_name}' deletion"
-        )
-        return
-
-    existing_channel = discord.utils.get(category.channels, name=channel_name)
+    existing_channel = find_channel(guild=guild, channel_name=channel_name)
 
     if existing_channel is not None:
         await existing_channel.delete()
+        channel_index.remove(guild.id, existing_channel.id)
         print(f"Channel '{channel_name}' was deleted")
     else:
         print(f"Channel '{channel_name}' didn't exist, skipping deletion")
@@ -105,20 +171,17 @@ async def get_channel(guild: Guild, channel_name: str) -> TextChannel:
 
     channel_name = format_channel_name(channel_name)
 
-    category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
-
-    if category is None:
-        raise ValueError("Can't retrieve channel as category didn't exist.")
-
-    existing_channel = discord.utils.get(category.channels, name=channel_name)
+    existing_channel = find_channel(guild=guild, channel_name=channel_name)
 
     if existing_channel is not None:
         return existing_channel
+    elif discord.utils.get(guild.categories, name=CATEGORY_NAME) is None:
+        raise ValueError("Can't retrieve channel as category didn't exist.")
     else:
         raise ValueError(f"Can't retrieve channel as '{channel_name}' didn't exist.")
 
 
-async def send_new_banners(channel: TextChannel, banners: list[Image]):
+async def send_new_banners(channel: TextChannel, banners: list["Image"]):
     """Send the messages with the latest user banners"""
 
     for index, banner in enumerate(banners):
@@ -140,6 +203,82 @@ async def send_new_banners(channel: TextChannel, banners: list[Image]):
 #################### Sync ####################
 
 
+def channel_overwrites(guild: Guild, allow_user_messages: bool) -> dict:
+    """Returns the permissions of a bot channel"""
+
+    # The bot will have an interactive channel and the rest are only informative so the user can't write there
+    return {
+        guild.default_role: discord.PermissionOverwrite(
+            send_messages=allow_user_messages,
+            view_channel=True,
+            read_message_history=True,
+        ),
+        guild.me: discord.PermissionOverwrite(send_messages=True),
+    }
+
+
+def has_expected_permissions(channel: GuildChannel, allow_user_messages: bool) -> bool:
+    """Checks if `channel` has the permissions given by `channel_overwrites`"""
+
+    return isinstance(channel, TextChannel) and channel.overwrites == channel_overwrites(
+        channel.guild, allow_user_messages
+    )
+
+
+def find_channel(guild: Guild, channel_name: str) -> TextChannel | None:
+    """
+    Returns the channel with the (already formatted) `channel_name` inside the bot category, if it exists.
+    The channel index is checked first and the guild is only searched on a miss.
+    """
+
+    channel_id = channel_index.get(guild.id, channel_name)
+
+    if channel_id is not None:
+        channel = guild.get_channel(channel_id)
+
+        if channel is not None and is_bot_channel(channel, channel_name):
+            return channel
+
+        channel_index.remove(guild.id, channel_id)  # Stale entry
+
+    category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
+
+    if category is None:
+        return None
+
+    channel = discord.utils.get(category.channels, name=channel_name)
+
+    if channel is not None:
+        channel_index.set(guild.id, channel_name, channel.id)
+
+    return channel
+
+
+def index_channel(channel: GuildChannel):
+    """Updates the channel index after `channel` was created or updated"""
+
+    channel_index.remove(channel.guild.id, channel.id)
+
+    if isinstance(channel, TextChannel) and is_bot_channel(channel, channel.name):
+        channel_index.set(channel.guild.id, channel.name, channel.id)
+
+
+def unindex_channel(channel: GuildChannel):
+    """Updates the channel index after `channel` was deleted"""
+
+    channel_index.remove(channel.guild.id, channel.id)
+
+
+def is_bot_channel(channel: GuildChannel, channel_name: str) -> bool:
+    """Checks if `channel` is named `channel_name` and inside the bot category"""
+
+    return (
+        channel.name == channel_name
+        and channel.category is not None
+        and channel.category.name == CATEGORY_NAME
+    )
+
+
 def format_channel_name(channel_name: str) -> str:
     """Formats the desired channel name to the name given by Discord"""
 
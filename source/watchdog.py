@@ -0,0 +1,146 @@
+""" Contains the watchdog that detects blocking work on the event loop """
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from constants import WATCHDOG_INTERVAL, WATCHDOG_THRESHOLD
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoopWatchdog:
+    """
+    Measures the event loop lag continuously with a heartbeat task and, from a separate thread,
+    captures the stack of the event loop whenever a callback blocks it for longer than `threshold` seconds.
+    The blocking call sites are counted so the worst offenders can be reported.
+    """
+
+    def __init__(
+        self, interval: float = WATCHDOG_INTERVAL, threshold: float = WATCHDOG_THRESHOLD
+    ) -> None:
+
+        self.__interval = interval
+        self.__threshold = threshold
+
+        self.__loop_thread_id: int | None = None
+        self.__last_beat = time.monotonic()
+        self.__heartbeat_task: asyncio.Task | None = None
+
+        # Lag stats
+        self.__beats = 0
+        self.__total_lag = 0.0
+        self.__max_lag = 0.0
+
+        # Blocking call sites
+        self.__blocking_site: str | None = None  # Of the block happening right now
+        self.__offenders: Counter[str] = Counter()
+        self.__worst_blocks: dict[str, float] = dict()  # Longest block (in seconds) per call site
+
+    def start(self):
+        """Starts watching the running event loop"""
+
+        if self.__heartbeat_task is not None:
+            return
+
+        self.__loop_thread_id = threading.get_ident()
+        self.__last_beat = time.monotonic()
+        self.__heartbeat_task = asyncio.create_task(self.__heartbeat())
+
+        threading.Thread(target=self.__watch, name="loop-watchdog", daemon=True).start()
+
+        print(
+            f"Event loop watchdog started (blocks longer than {self.__threshold} seconds are captured)"
+        )
+
+    def get_lag(self) -> tuple[float, float]:
+        """Returns the average and the maximum event loop lag (in seconds)"""
+
+        average_lag = self.__total_lag / self.__beats if self.__beats > 0 else 0.0
+
+        return average_lag, self.__max_lag
+
+    def get_worst_offenders(self, n: int) -> list[tuple[str, int, float]]:
+        """Returns the `n` call sites that blocked the event loop the most (with the count and the longest block)"""
+
+        return [
+            (call_site, count, self.__worst_blocks.get(call_site, 0.0))
+            for call_site, count in self.__offenders.most_common(n)
+        ]
+
+    async def __heartbeat(self):
+        """Sleeps for `interval` seconds in a loop, measuring how late it wakes up"""
+
+        while True:
+            expected_beat = time.monotonic() + self.__interval
+            await asyncio.sleep(self.__interval)
+            now = time.monotonic()
+
+            lag = max(now - expected_beat, 0.0)
+            self.__beats += 1
+            self.__total_lag += lag
+            self.__max_lag = max(self.__max_lag, lag)
+
+            # The block captured by the watchdog thread (if any) is over, now its duration is known
+            if self.__blocking_site is not None:
+                self.__worst_blocks[self.__blocking_site] = max(
+                    self.__worst_blocks.get(self.__blocking_site, 0.0), lag
+                )
+                self.__blocking_site = None
+
+            self.__last_beat = now
+
+    def __watch(self):
+        """Runs in a separate thread, capturing the event loop stack when the heartbeat is late"""
+
+        captured_beat = None
+
+        while True:
+            time.sleep(self.__interval / 2)
+
+            last_beat = self.__last_beat
+            if last_beat == captured_beat:
+                continue  # Already captured this block
+
+            if time.monotonic() - last_beat < self.__interval + self.__threshold:
+                continue
+
+            frame = sys._current_frames().get(self.__loop_thread_id)
+            if frame is None:
+                continue
+
+            stack = traceback.extract_stack(frame)
+            call_site = _find_call_site(stack)
+
+            # The whole stack is only printed the first time a call site blocks
+            if call_site not in self.__offenders:
+                print(
+                    f"Event loop blocked at {call_site}:\n{''.join(traceback.format_list(stack))}"
+                )
+            else:
+                print(f"Event loop blocked at {call_site}")
+
+            self.__offenders[call_site] += 1
+            self.__blocking_site = call_site
+            captured_beat = last_beat
+
+
+def _find_call_site(stack: traceback.StackSummary) -> str:
+    """Returns the innermost frame of the bot code in `stack` (or the innermost frame, if none is)"""
+
+    frame = stack[-1]
+    for candidate in reversed(stack):
+        if os.path.abspath(candidate.filename).startswith(SOURCE_DIR + os.sep):
+            frame = candidate
+            break
+
+    filename = os.path.relpath(frame.filename, SOURCE_DIR)
+
+    return f"{filename}:{frame.lineno} ({frame.name})"
+
+
+loop_watchdog = LoopWatchdog()
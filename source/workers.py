@@ -0,0 +1,83 @@
+""" Contains the worker processes that scrape and render the player updates """
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+from singleton_browser import close_browser_instance, forget_browser_instance
+
+from classes.player import Player, PlayerUpdate
+
+WORKER_PROCESSES_VARIABLE = "WORKER_PROCESSES"
+""" Environment variable with the number of worker processes (the worker mode is off when unset or 0) """
+
+# Event loop of a worker process, kept between jobs so the browser of the worker stays alive
+_worker_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_worker_processes() -> int:
+    """Returns the number of worker processes to use (0 means the updates run in the bot process)"""
+
+    return int(os.getenv(WORKER_PROCESSES_VARIABLE, "0"))
+
+
+class WorkerPool:
+    """
+    Hands out player updates to local worker processes, each with its own browser page and rendering.
+    The workers only return the updates, the coordinator (the bot process) is the one writing them to the database.
+    """
+
+    def __init__(self, processes: int) -> None:
+
+        # Spawn the workers instead of forking the bot, which has threads running (and maybe a browser) that
+        # the workers must not inherit
+        self.__executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialize_worker,
+        )
+
+    async def update_player(self, player: Player) -> PlayerUpdate:
+        """Scrapes the new platinums of `player` (and renders their banners) in a worker process"""
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__executor, _update_player, player
+        )
+
+    def shutdown(self):
+        """Stops the worker processes, closing their browsers"""
+
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+
+def _initialize_worker():
+    """Prepares a worker process to run player updates"""
+
+    global _worker_loop
+
+    # Each worker launches its own browser
+    forget_browser_instance()
+
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+
+    # Worker processes exit without running `atexit`, so close the browser through the multiprocessing finalizers
+    Finalize(None, _close_worker_browser, exitpriority=10)
+
+
+def _update_player(player: Player) -> PlayerUpdate:
+    """Runs the update of `player` in the worker process"""
+
+    return _worker_loop.run_until_complete(player.get_new_platinums_banners())
+
+
+def _close_worker_browser():
+    _worker_loop.run_until_complete(close_browser_instance())